@@ -0,0 +1,106 @@
+"""
+Compare the WSGI (sync views) and ASGI (async views) read paths under many
+concurrent slow clients.
+
+Both paths run in-process against a seeded throwaway database. Each client
+spends --client-delay seconds on the wire before its request is handled
+(a slow upload / slow network). On the WSGI path that time is spent inside
+one of --threads worker threads, as it would be under a threaded WSGI
+server; on the ASGI path it is an await on the event loop. Every client
+then sends --requests-per-client requests cycling through professors/,
+module-instances/, ratings/ and average/.
+
+    python benchmarks/async_concurrency.py --clients 200 --threads 8 --client-delay 0.05
+"""
+import argparse
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from common import emit, latency_summary, setup_django, test_database
+
+
+def endpoints(prefix, average_path):
+    return [f'{prefix}professors/?limit=50', f'{prefix}module-instances/?limit=50', f'{prefix}ratings/', f'{prefix}{average_path}']
+
+
+def run_wsgi(args, token, average_path):
+    from django.test import Client
+
+    local = threading.local()
+    paths = endpoints('/api/', average_path)
+
+    def one_client(n):
+        if not hasattr(local, 'client'):
+            local.client = Client(HTTP_AUTHORIZATION=f'Token {token}')
+        latencies = []
+        for i in range(args.requests_per_client):
+            # A client's first request arrived when the run started, even if it waited for a free thread.
+            start = arrived if i == 0 else time.perf_counter()
+            time.sleep(args.client_delay)  # The slow client holds this worker thread.
+            response = local.client.get(paths[(n + i) % len(paths)])
+            assert response.status_code == 200, response.content
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    start = arrived = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        latencies = [latency for result in pool.map(one_client, range(args.clients)) for latency in result]
+    return latency_summary(latencies, time.perf_counter() - start)
+
+
+def run_asgi(args, token, average_path):
+    from django.test import AsyncClient
+
+    paths = endpoints('/api/async/', average_path)
+
+    async def one_client(client, n):
+        latencies = []
+        for i in range(args.requests_per_client):
+            start = time.perf_counter()
+            await asyncio.sleep(args.client_delay)  # The slow client only parks a coroutine.
+            response = await client.get(paths[(n + i) % len(paths)], headers={'Authorization': f'Token {token}'})
+            assert response.status_code == 200, response.content
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    async def main():
+        client = AsyncClient()
+        results = await asyncio.gather(*(one_client(client, n) for n in range(args.clients)))
+        return [latency for result in results for latency in result]
+
+    start = time.perf_counter()
+    latencies = asyncio.run(main())
+    return latency_summary(latencies, time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=200, help="Concurrent clients.")
+    parser.add_argument('--threads', type=int, default=8, help="Worker threads on the WSGI path.")
+    parser.add_argument('--client-delay', type=float, default=0.05, help="Seconds each request spends on a slow client.")
+    parser.add_argument('--requests-per-client', type=int, default=4)
+    parser.add_argument('--output', help="Also write the JSON report to this file.")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.test import Client
+    from myapp.models import Rating
+
+    with test_database():
+        token = Client().post(
+            '/api/login/', {'username': 'user0', 'password': 'password'}, content_type='application/json'
+        ).json()['token']
+        rating = Rating.objects.select_related('module_instance').first()
+        average_path = f'average/{rating.professor_id}/{rating.module_instance.module_id}/'
+
+        emit({
+            'config': vars(args),
+            'wsgi': run_wsgi(args, token, average_path),
+            'asgi': run_asgi(args, token, average_path),
+        }, args.output)
+
+
+if __name__ == '__main__':
+    main()
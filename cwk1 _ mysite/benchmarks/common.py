@@ -0,0 +1,81 @@
+"""Shared helpers for the scripts in benchmarks/."""
+import json
+import os
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+
+
+def setup_django():
+    """Make the project importable and configure Django from cwk1.settings, with throttling off by default."""
+    sys.path.insert(0, str(PROJECT_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'cwk1.settings')
+    # Benchmarks measure capacity, so request throttling is off unless asked for
+    # (this also reaches the server started by loadtest.py, which inherits the environment).
+    os.environ.setdefault('CWK1_THROTTLE_ENABLED', '0')
+    import django
+    django.setup()
+
+
+@contextmanager
+def test_database(**seed_options):
+    """Create a throwaway test database seeded with myapp.seeding.seed_sample, and drop it afterwards."""
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+    from myapp.seeding import seed_sample
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        seed_sample(**seed_options)
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+@contextmanager
+def sqlite_file(directory, name):
+    """Point the SQLite test database at a file in `directory` instead of memory (no-op on other backends)."""
+    from django.db import connection
+
+    if connection.vendor != 'sqlite':
+        yield
+        return
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    old_name = test_settings.get('NAME')
+    test_settings['NAME'] = os.path.join(directory, name)
+    try:
+        yield
+    finally:
+        test_settings['NAME'] = old_name
+
+
+def percentile(sorted_values, fraction):
+    """Return the value at `fraction` (0-1) of an already sorted list."""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, round(fraction * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+def latency_summary(latencies, elapsed):
+    """Summarise a list of per-request latencies (seconds) measured over `elapsed` seconds."""
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'throughput_rps': round(len(latencies) / elapsed, 1) if elapsed else None,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2) if latencies else None,
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2) if latencies else None,
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2) if latencies else None,
+    }
+
+
+def emit(report, output=None):
+    """Print a JSON report, and write it to `output` if given."""
+    text = json.dumps(report, indent=2)
+    print(text)
+    if output:
+        Path(output).write_text(text + '\n')
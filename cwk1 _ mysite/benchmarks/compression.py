@@ -0,0 +1,105 @@
+"""
+Measure the bandwidth / latency trade-off of response compression on the
+catalogue endpoints.
+
+Each endpoint is fetched --repeat times per content coding (identity, gzip,
+and br when the brotli package is installed) through the full Django stack
+against a seeded throwaway database. The report gives the bytes on the wire,
+the median server time (which includes compressing), the client's
+decompression time, and the resulting time to the last byte over each of
+--links (Mbit/s) with --rtt milliseconds of round trip:
+
+    server + rtt + bytes / bandwidth + decompress
+
+    python benchmarks/compression.py --links 0.5 2 10 100 --rtt 80
+"""
+import argparse
+import json
+import statistics
+import tempfile
+import time
+import zlib
+
+from common import emit, setup_django, sqlite_file, test_database
+
+ENDPOINTS = [
+    'professors/?limit=100',
+    'module-instances/?limit=100',
+    'module-instances/?stream=1',
+    'ratings/?limit=100',
+]
+
+
+def decompressor(coding):
+    """Return a function undoing `coding`."""
+    if coding == 'gzip':
+        return lambda body: zlib.decompress(body, 31)
+    if coding == 'br':
+        import brotli
+        return brotli.decompress
+    return lambda body: body
+
+
+def measure(client, path, coding, repeat):
+    """Fetch `path` with Accept-Encoding: `coding` and return (wire bytes, identity bytes, server s, decompress s)."""
+    undo = decompressor(coding)
+    server, decompress = [], []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get(path, HTTP_ACCEPT_ENCODING=coding)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        server.append(time.perf_counter() - started)
+        assert response.status_code == 200, (path, response.status_code)
+
+        started = time.perf_counter()
+        identity = undo(body) if response.get('Content-Encoding') == coding else body
+        decompress.append(time.perf_counter() - started)
+    return len(body), len(identity), statistics.median(server), statistics.median(decompress)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=20, help="Requests per endpoint and coding.")
+    parser.add_argument('--links', type=float, nargs='+', default=[0.5, 2, 10, 100], help="Link speeds in Mbit/s.")
+    parser.add_argument('--rtt', type=float, default=80, help="Round trip time in milliseconds.")
+    parser.add_argument('--instances', type=int, default=2000, help="Module instances to seed.")
+    parser.add_argument('--output', help="Also write the JSON report to this file.")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.test import Client
+    from myapp import middleware
+
+    codings = ['identity', 'gzip'] + (['br'] if middleware.brotli is not None else [])
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp, sqlite_file(tmp, 'compression.sqlite3'), \
+            test_database(instances=args.instances, ratings_per_user=100):
+        token = Client().post(
+            '/api/login/', json.dumps({'username': 'user0', 'password': 'password'}), content_type='application/json'
+        ).json()['token']
+        client = Client(HTTP_AUTHORIZATION=f'Token {token}')
+        for endpoint in ENDPOINTS:
+            results[endpoint] = {}
+            for coding in codings:
+                wire, identity, server, decompress = measure(client, '/api/' + endpoint, coding, args.repeat)
+                results[endpoint][coding] = {
+                    'bytes': wire,
+                    'ratio': round(identity / wire, 2),
+                    'server_ms': round(server * 1000, 2),
+                    'decompress_ms': round(decompress * 1000, 3),
+                    'time_to_last_byte_ms': {
+                        f'{mbit}Mbit': round((server + args.rtt / 1000 + wire * 8 / (mbit * 1e6) + decompress) * 1000, 1)
+                        for mbit in args.links
+                    },
+                }
+
+    from django.conf import settings
+    emit({
+        'config': {**vars(args), 'min_size': settings.COMPRESSION_MIN_SIZE,
+                   'gzip_level': settings.COMPRESSION_GZIP_LEVEL, 'brotli_quality': settings.COMPRESSION_BROTLI_QUALITY},
+        'endpoints': results,
+    }, args.output)
+
+
+if __name__ == '__main__':
+    main()
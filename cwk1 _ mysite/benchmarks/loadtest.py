@@ -0,0 +1,263 @@
+"""
+Drive a running copy of the API with a weighted mix of traffic and report
+per-endpoint throughput and p50/p95/p99 latency as JSON.
+
+A fresh SQLite database is migrated and seeded in a temporary directory,
+then the app is started against it in a subprocess (manage.py runserver by
+default, or --server-cmd for a production server) so requests go over real
+HTTP. --concurrency worker threads, each logged in as its own seeded user,
+pick endpoints according to --mix until --duration seconds have passed.
+
+    python benchmarks/loadtest.py --concurrency 16 --duration 30 --output before.json
+    python benchmarks/loadtest.py --mix professors=1,average=1 --server-cmd "gunicorn -w 4 -b 127.0.0.1:{port} cwk1.wsgi"
+
+Runs with the same --seed make the same choices, so reports from different
+commits can be compared directly.
+"""
+import argparse
+import os
+import random
+import shlex
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+import requests
+
+from common import PROJECT_DIR, emit, latency_summary, setup_django
+
+DEFAULT_MIX = 'login=1,professors=3,module-instances=3,ratings=2,average=4,rate=2'
+
+
+def parse_mix(text):
+    """Parse 'name=weight,...' into {name: weight}."""
+    mix = {}
+    for item in text.split(','):
+        name, _, weight = item.partition('=')
+        if name not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"unknown endpoint {name!r}; choose from {', '.join(ENDPOINTS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+# ------------------------------------------------------------------------
+# Endpoints
+# ------------------------------------------------------------------------
+
+# Each endpoint takes (worker, rng) and returns the response.
+
+def login(worker, rng):
+    return worker.session.post(f'{worker.base_url}/api/login/', json={'username': worker.username, 'password': worker.password})
+
+
+def professors(worker, rng):
+    return worker.session.get(f'{worker.base_url}/api/professors/', params={'limit': 50}, headers=worker.headers)
+
+
+def module_instances(worker, rng):
+    return worker.session.get(f'{worker.base_url}/api/module-instances/', params={'limit': 50}, headers=worker.headers)
+
+
+def ratings(worker, rng):
+    return worker.session.get(f'{worker.base_url}/api/ratings/', params={'limit': 50}, headers=worker.headers)
+
+
+def average(worker, rng):
+    professor_id, module_code = rng.choice(worker.data['rated'])
+    return worker.session.get(f'{worker.base_url}/api/average/{professor_id}/{module_code}/', headers=worker.headers)
+
+
+def rate(worker, rng):
+    professor_id, instance_id, _ = rng.choice(worker.data['taught'])
+    return worker.session.post(
+        f'{worker.base_url}/api/rate/',
+        json={'professor_id': professor_id, 'module_instance_id': instance_id, 'rating': rng.randint(1, 5)},
+        headers=worker.headers,
+    )
+
+
+ENDPOINTS = {
+    'login': login,
+    'professors': professors,
+    'module-instances': module_instances,
+    'ratings': ratings,
+    'average': average,
+    'rate': rate,
+}
+
+# Statuses counted as success, per endpoint; anything else is reported under 'errors'.
+EXPECTED_STATUS = {'rate': {200, 201}}
+
+
+# ------------------------------------------------------------------------
+# Database and Server
+# ------------------------------------------------------------------------
+
+def prepare_database(path, args):
+    """Migrate and seed the SQLite file at `path`; return the data the workers pick requests from."""
+    os.environ['CWK1_SQLITE_PATH'] = path
+    setup_django()
+    from django.core.management import call_command
+    from django.db import connections
+    from myapp.models import ModuleInstance, ProfessorModuleAggregate
+    from myapp.seeding import seed_sample
+
+    call_command('migrate', verbosity=0)
+    seed_sample(
+        professors=args.professors, modules=args.modules, instances=args.instances,
+        users=args.users, seed=args.seed,
+    )
+    taught = list(ModuleInstance.professors.through.objects.values_list(
+        'professor_id', 'moduleinstance_id', 'moduleinstance__module_id'
+    ).order_by('moduleinstance_id', 'professor_id'))
+    rated = list(ProfessorModuleAggregate.objects.filter(count__gt=0).values_list('professor_id', 'module_id').order_by('id'))
+    connections.close_all()
+    return {'taught': taught, 'rated': rated}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(args, path, port):
+    """Start the app in a subprocess and wait until it accepts connections."""
+    if args.server_cmd:
+        command = shlex.split(args.server_cmd.format(port=port))
+    else:
+        command = [sys.executable, 'manage.py', 'runserver', '--noreload', f'127.0.0.1:{port}']
+    env = {**os.environ, 'CWK1_SQLITE_PATH': path}
+    server = subprocess.Popen(command, cwd=PROJECT_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited with status {server.returncode}: {' '.join(command)}")
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return server
+        except OSError:
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError(f"Server did not start listening on port {port}.")
+
+
+# ------------------------------------------------------------------------
+# Load Generation
+# ------------------------------------------------------------------------
+
+class Worker:
+    """One simulated client: a keep-alive session logged in as its own user."""
+
+    def __init__(self, n, base_url, data, args):
+        self.base_url = base_url
+        self.data = data
+        self.username = f'user{n}'
+        self.password = 'password'
+        self.session = requests.Session()
+        response = login(self, None)
+        response.raise_for_status()
+        self.headers = {'Authorization': f"Token {response.json()['token']}"}
+
+
+def run_load(base_url, data, args):
+    """Run the traffic mix; return ({endpoint: [latency]}, {endpoint: {status: count}}, elapsed)."""
+    names = list(args.mix)
+    weights = [args.mix[name] for name in names]
+    latencies = defaultdict(list)
+    errors = defaultdict(lambda: defaultdict(int))
+    lock = threading.Lock()
+    workers = [Worker(n, base_url, data, args) for n in range(args.concurrency)]
+    barrier = threading.Barrier(args.concurrency + 1)
+
+    def drive(n):
+        worker, rng = workers[n], random.Random(f'{args.seed}-{n}')
+        local_latencies, local_errors = defaultdict(list), defaultdict(lambda: defaultdict(int))
+        barrier.wait()
+        warmup_end = start + args.warmup
+        while time.perf_counter() < end:
+            name = rng.choices(names, weights)[0]
+            sent = time.perf_counter()
+            try:
+                response = ENDPOINTS[name](worker, rng)
+                status = response.status_code
+            except requests.RequestException as e:
+                status = type(e).__name__
+            finished = time.perf_counter()
+            if name == 'login' and status == 200:
+                worker.headers = {'Authorization': f"Token {response.json()['token']}"}
+            if sent < warmup_end:
+                continue
+            local_latencies[name].append(finished - sent)
+            if status not in EXPECTED_STATUS.get(name, {200}):
+                local_errors[name][status] += 1
+        with lock:
+            for name, values in local_latencies.items():
+                latencies[name].extend(values)
+            for name, counts in local_errors.items():
+                for status, count in counts.items():
+                    errors[name][status] += count
+
+    threads = [threading.Thread(target=drive, args=(n,)) for n in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    start = time.perf_counter()
+    end = start + args.warmup + args.duration
+    barrier.wait()
+    for thread in threads:
+        thread.join()
+    return latencies, errors, time.perf_counter() - start - args.warmup
+
+
+def build_report(args, latencies, errors, elapsed):
+    endpoints = {}
+    for name in args.mix:
+        summary = latency_summary(latencies.get(name, []), elapsed)
+        summary['errors'] = {str(status): count for status, count in sorted(errors.get(name, {}).items(), key=str)}
+        endpoints[name] = summary
+    overall = latency_summary([value for values in latencies.values() for value in values], elapsed)
+    overall['errors'] = sum(sum(counts.values()) for counts in errors.values())
+    config = {**vars(args), 'mix': args.mix}
+    return {'config': config, 'elapsed_s': round(elapsed, 2), 'overall': overall, 'endpoints': endpoints}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', type=int, default=8, help="Concurrent client threads.")
+    parser.add_argument('--duration', type=float, default=20, help="Seconds of measured load.")
+    parser.add_argument('--warmup', type=float, default=2, help="Seconds of unmeasured load before measuring.")
+    parser.add_argument('--mix', type=parse_mix, default=DEFAULT_MIX, help=f"Endpoint weights (default: {DEFAULT_MIX}).")
+    parser.add_argument('--server-cmd', help="Command that serves the app; {port} is replaced. Defaults to manage.py runserver.")
+    parser.add_argument('--professors', type=int, default=200)
+    parser.add_argument('--modules', type=int, default=50)
+    parser.add_argument('--instances', type=int, default=400)
+    parser.add_argument('--users', type=int, default=50, help="Seeded users; at least --concurrency.")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed for the data and the request mix.")
+    parser.add_argument('--output', help="Also write the JSON report to this file.")
+    args = parser.parse_args()
+    if isinstance(args.mix, str):
+        args.mix = parse_mix(args.mix)
+    if args.concurrency > args.users:
+        # Workers sharing a user would share its token and throttle bucket, skewing the results.
+        parser.error(f"--concurrency ({args.concurrency}) must not exceed --users ({args.users}).")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'loadtest.sqlite3')
+        data = prepare_database(path, args)
+        port = free_port()
+        server = start_server(args, path, port)
+        try:
+            latencies, errors, elapsed = run_load(f'http://127.0.0.1:{port}', data, args)
+        finally:
+            server.terminate()
+            server.wait()
+    emit(build_report(args, latencies, errors, elapsed), args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""
+Measure login throughput per core, and how much a login burst slows reads.
+
+Two phases run against a seeded throwaway database through the full Django
+stack. First --readers threads GET professors/ on their own. Then --clients
+threads log in as fast as they can while the readers keep reading. The report
+gives logins/sec, logins/sec per hashing core, the number of fast 503s from the
+bounded hashing executor, and read latency in both phases.
+
+    python benchmarks/login_throughput.py --clients 32 --readers 4
+    CWK1_HASHING_MAX_CONCURRENCY=4 CWK1_PASSWORD_HASHER_PROFILE=pbkdf2 python benchmarks/login_throughput.py
+"""
+import argparse
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from common import emit, latency_summary, setup_django, sqlite_file, test_database
+
+
+def run_phase(args, token, logins):
+    """Run the readers (and, if `logins`, the login clients) for --duration seconds."""
+    from django.db import connections
+    from django.test import Client
+
+    read_latencies, login_latencies, login_statuses = [], [], Counter()
+    lock = threading.Lock()
+    end = time.perf_counter() + args.duration
+
+    def read():
+        client, latencies = Client(HTTP_AUTHORIZATION=f'Token {token}'), []
+        while time.perf_counter() < end:
+            started = time.perf_counter()
+            client.get('/api/professors/?limit=50')
+            latencies.append(time.perf_counter() - started)
+        connections.close_all()
+        with lock:
+            read_latencies.extend(latencies)
+
+    def login(n):
+        client, latencies, statuses = Client(), [], Counter()
+        # user0 is left to the readers: logging in again would revoke their token.
+        body = json.dumps({'username': f'user{1 + n % (args.users - 1)}', 'password': 'password'})
+        while time.perf_counter() < end:
+            started = time.perf_counter()
+            status = client.post('/api/login/', body, content_type='application/json').status_code
+            statuses[status] += 1
+            if status == 200:
+                latencies.append(time.perf_counter() - started)
+        connections.close_all()
+        with lock:
+            login_latencies.extend(latencies)
+            login_statuses.update(statuses)
+
+    threads = [threading.Thread(target=read) for _ in range(args.readers)]
+    if logins:
+        threads += [threading.Thread(target=login, args=(n,)) for n in range(args.clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    result = {'reads': latency_summary(read_latencies, elapsed)}
+    if logins:
+        result['logins'] = latency_summary(login_latencies, elapsed)
+        result['logins']['statuses'] = {str(status): count for status, count in sorted(login_statuses.items())}
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=16, help="Threads logging in concurrently.")
+    parser.add_argument('--readers', type=int, default=2, help="Threads reading professors/ throughout.")
+    parser.add_argument('--duration', type=float, default=10, help="Seconds per phase.")
+    parser.add_argument('--users', type=int, default=50, help="Seeded users to log in as (at least 2).")
+    parser.add_argument('--output', help="Also write the JSON report to this file.")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.contrib.auth.hashers import get_hasher
+    from django.test import Client
+
+    logging.getLogger('django.request').setLevel(logging.CRITICAL)  # The 503s are expected.
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+    hashing_cores = min(settings.HASHING_MAX_CONCURRENCY, cores)
+    with tempfile.TemporaryDirectory() as tmp, sqlite_file(tmp, 'logins.sqlite3'), test_database(users=args.users):
+        token = Client().post(
+            '/api/login/', json.dumps({'username': 'user0', 'password': 'password'}), content_type='application/json'
+        ).json()['token']
+        reads_alone = run_phase(args, token, logins=False)
+        burst = run_phase(args, token, logins=True)
+
+    logins = burst['logins']
+    logins['per_hashing_core'] = round(logins['throughput_rps'] / hashing_cores, 2) if logins['throughput_rps'] else None
+    hasher = get_hasher()
+    emit({
+        'config': vars(args),
+        'hashing': {
+            'hasher': hasher.algorithm,
+            'iterations': getattr(hasher, 'iterations', None),
+            'max_concurrency': settings.HASHING_MAX_CONCURRENCY,
+            'queue_depth': settings.HASHING_QUEUE_DEPTH,
+            'cores': cores,
+        },
+        'reads_alone': reads_alone['reads'],
+        'reads_during_logins': burst['reads'],
+        'logins': logins,
+    }, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""
+Measure concurrent rate/ write throughput under the selected database profile.
+
+--writers threads each log in as their own fresh user and POST ratings for
+distinct (professor, module instance) pairs through the full Django stack,
+so every request commits one new rating (201) and updates the rating aggregates.
+Failed writes (e.g. "database is locked") are counted, not retried.
+
+The profile comes from the environment, as for the app itself:
+
+    python benchmarks/write_throughput.py --writers 16
+    CWK1_SQLITE_WAL=1 python benchmarks/write_throughput.py --writers 16
+    CWK1_DB_PROFILE=postgres CWK1_PG_POOL_MAX_SIZE=20 python benchmarks/write_throughput.py --writers 16
+
+On SQLite, --sqlite-baseline adds a run with the pragmas and IMMEDIATE
+transactions switched off, for comparison with the tuned profile. SQLite
+runs use a database file rather than the in-memory test database, so
+journaling and locking behave as in production.
+"""
+import argparse
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from common import emit, latency_summary, setup_django, sqlite_file, test_database
+
+
+@contextmanager
+def untuned_sqlite():
+    """Turn off SQLITE_PRAGMAS and IMMEDIATE transactions for connections opened inside the block."""
+    from django.db import connections
+    from django.test import override_settings
+
+    options = connections.settings['default'].setdefault('OPTIONS', {})
+    mode = options.pop('transaction_mode', None)
+    try:
+        with override_settings(SQLITE_PRAGMAS={}):
+            yield
+    finally:
+        if mode is not None:
+            options['transaction_mode'] = mode
+
+
+def run_writers(args):
+    """Create --writers users and have them rate in parallel; return the report for this run."""
+    import json
+
+    from django.contrib.auth.hashers import make_password
+    from django.contrib.auth.models import User
+    from django.db import connections
+    from django.test import Client
+    from myapp.models import ModuleInstance
+
+    User.objects.bulk_create(
+        User(username=f'writer{n}', password=make_password('password')) for n in range(args.writers)
+    )
+    taught = list(ModuleInstance.professors.through.objects.values_list('professor_id', 'moduleinstance_id').order_by('id'))
+    latencies, statuses = [], Counter()
+    lock = threading.Lock()
+    barrier = threading.Barrier(args.writers + 1)
+
+    def write(n):
+        client = Client()
+        token = client.post(
+            '/api/login/', json.dumps({'username': f'writer{n}', 'password': 'password'}), content_type='application/json'
+        ).json()['token']
+        local_latencies, local_statuses = [], Counter()
+        barrier.wait()
+        for professor_id, instance_id in taught[n::args.writers][:args.writes_per_writer]:
+            started = time.perf_counter()
+            try:
+                status = client.post(
+                    '/api/rate/',
+                    json.dumps({'professor_id': professor_id, 'module_instance_id': instance_id, 'rating': 1 + (n + instance_id) % 5}),
+                    content_type='application/json', HTTP_AUTHORIZATION=f'Token {token}',
+                ).status_code
+            except Exception as e:  # The test client re-raises view exceptions (e.g. OperationalError).
+                status = type(e).__name__
+            local_latencies.append(time.perf_counter() - started)
+            local_statuses[status] += 1
+        connections.close_all()
+        with lock:
+            latencies.extend(local_latencies)
+            statuses.update(local_statuses)
+
+    threads = [threading.Thread(target=write, args=(n,)) for n in range(args.writers)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    summary = latency_summary(latencies, elapsed)
+    summary['statuses'] = {str(status): count for status, count in sorted(statuses.items(), key=str)}
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--writers', type=int, default=8, help="Concurrent writer threads.")
+    parser.add_argument('--writes-per-writer', type=int, default=100)
+    parser.add_argument('--sqlite-baseline', action='store_true', help="Also run with the SQLite tuning switched off.")
+    parser.add_argument('--output', help="Also write the JSON report to this file.")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.db import connection
+
+    seed_options = {'professors': 200, 'modules': 50, 'instances': 400 + args.writers * args.writes_per_writer // 2, 'users': 2}
+    runs = {}
+    if connection.vendor == 'sqlite':
+        with tempfile.TemporaryDirectory() as tmp:
+            if args.sqlite_baseline:
+                with untuned_sqlite(), sqlite_file(tmp, 'baseline.sqlite3'), test_database(**seed_options):
+                    runs['sqlite (untuned)'] = run_writers(args)
+            with sqlite_file(tmp, 'tuned.sqlite3'), test_database(**seed_options):
+                runs['sqlite'] = run_writers(args)
+    else:
+        with test_database(**seed_options):
+            runs[settings.DB_PROFILE] = run_writers(args)
+
+    emit({
+        'config': vars(args),
+        'profile': {
+            'name': settings.DB_PROFILE,
+            'conn_max_age': settings.DATABASES['default'].get('CONN_MAX_AGE'),
+            'options': {key: value for key, value in settings.DATABASES['default'].get('OPTIONS', {}).items()},
+            'sqlite_pragmas': settings.SQLITE_PRAGMAS if connection.vendor == 'sqlite' else None,
+        },
+        'runs': runs,
+    }, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,52 @@
+import os
 import requests
 import re
+from requests.adapters import HTTPAdapter
 from tabulate import tabulate
 from datetime import datetime
+from urllib3.util.retry import Retry
 
 current_year = datetime.now().year  # Get the current year
 
 BASE_URL = None  # Change this to your deployed URL if needed
 token = None  # To store authentication token
 
+# Connection pooling and retries, overridable from the environment (as in refactoredclient.py)
+POOL_SIZE = int(os.environ.get('CWK1_POOL_SIZE', 10))  # Keep-alive connections kept open to the server
+MAX_RETRIES = int(os.environ.get('CWK1_MAX_RETRIES', 3))  # Retries for idempotent requests
+RETRY_BACKOFF = float(os.environ.get('CWK1_RETRY_BACKOFF', 0.3))  # Seconds, doubled on each retry
+TIMEOUT = (float(os.environ.get('CWK1_CONNECT_TIMEOUT', 3.05)), float(os.environ.get('CWK1_READ_TIMEOUT', 10)))
+session = None  # Shared pooled session, created on first use
+
+
+def get_session():
+    # Reuse one keep-alive session for every request instead of a new connection per call.
+    # Only GETs are retried, since repeating a POST could submit it twice.
+    global session
+    if session is None:
+        retry = Retry(total=MAX_RETRIES, backoff_factor=RETRY_BACKOFF, status_forcelist=(502, 503, 504),
+                      allowed_methods=frozenset({'GET', 'HEAD'}), raise_on_status=False)
+        adapter = HTTPAdapter(pool_maxsize=POOL_SIZE, max_retries=retry)
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+    return session
+
+
+def get_all_pages(path):
+    # Follow the 'next' cursor of a paginated list endpoint.
+    # Returns the last response and the collected items (None if a page failed).
+    items, params = [], None
+    while True:
+        response = get_session().get(f'{BASE_URL}/{path}', params=params, headers={'Authorization': f'Token {token}'}, timeout=TIMEOUT)
+        if response.status_code != 200:
+            return response, None
+        page = response.json()
+        items.extend(page['results'])
+        if not page.get('next'):
+            return response, items
+        params = {'cursor': page['next']}
+
 
 def register():
     global token  # To check if a user is already logged in
@@ -24,11 +63,11 @@ def register():
         return
     password = input("Enter password: ")
 
-    response = requests.post(f'{BASE_URL}/register/', json={
+    response = get_session().post(f'{BASE_URL}/register/', json={
         'username': username,
         'email': email,
         'password': password
-    })
+    }, timeout=TIMEOUT)
 
     if response.status_code == 200:
         print("Registration successful!")
@@ -62,10 +101,10 @@ def login(command):
 
     try:
         # Adding timeout and handling potential connection errors
-        response = requests.post(f'{BASE_URL}/login/', json={
+        response = get_session().post(f'{BASE_URL}/login/', json={
             'username': username,
             'password': password
-        }, timeout=5)  # Timeout set to 5 seconds
+        }, timeout=TIMEOUT)
 
         # Check if the request was successful
         if response.status_code == 200:
@@ -97,7 +136,7 @@ def login(command):
 def logout():
     global token
     if token:
-        response = requests.post(f'{BASE_URL}/logout/', headers={'Authorization': f'Token {token}'})
+        response = get_session().post(f'{BASE_URL}/logout/', headers={'Authorization': f'Token {token}'}, timeout=TIMEOUT)
         if response.status_code == 200:
             token = None
             print("Logout successful!")
@@ -113,17 +152,15 @@ def list_modules():
         return
     
     # Fetch module instances
-    response = requests.get(f'{BASE_URL}/module-instances/', headers={'Authorization': f'Token {token}'})
+    response, module_instances = get_all_pages('module-instances/')
     if response.status_code == 200:
-        module_instances = response.json()
 
         # Fetch professors
-        professor_response = requests.get(f'{BASE_URL}/professors/', headers={'Authorization': f'Token {token}'})
+        professor_response, professors = get_all_pages('professors/')
         if professor_response.status_code != 200:
             print("Failed to retrieve professors.")
             return
 
-        professors = professor_response.json()
         professor_dict = {prof['id']: prof['name'] for prof in professors}
 
         table_data=[]
@@ -154,10 +191,9 @@ def view_ratings():
         print("You need to log in to view the ratings")
         return
     
-    response = requests.get(f'{BASE_URL}/ratings/', headers={'Authorization': f'Token {token}'})
+    response, rating = get_all_pages('ratings/')
     if response.status_code == 200:
         table_data=[]
-        rating = response.json()
         if rating:
             # Prepare data for tabulate if ratings are not empty
             table_data = []
@@ -196,7 +232,7 @@ def average_rate(command):
     endpoint = f"{BASE_URL}/average/{professor_id}/{module_code}"
 
     try:
-        response = requests.get(endpoint, headers={'Authorization': f'Token {token}'})
+        response = get_session().get(endpoint, headers={'Authorization': f'Token {token}'}, timeout=TIMEOUT)
 
         if response.status_code == 200:
             data = response.json()
@@ -258,41 +294,20 @@ def rate_professor(command):
         print("Invalid rating. Please enter a number between 1 and 5.")
         return
 
-    # Retrieve module instances to find the matching module_instance_id
+    # Look up the matching module instance on the server
     try:
-        # ✅ Check if response is empty
-        if response.content.strip() == b'':
-            print("Received an empty response from the server.")
+        response = get_session().get(f'{BASE_URL}/module-instances/{module_code}/{year}/{semester}/', headers={'Authorization': f'Token {token}'}, timeout=TIMEOUT)
+        if response.status_code == 404:
+            print(f"No module instance found for {module_code} in {year} semester {semester}.")
             return
-
-        # ✅ Check if response is JSON-formatted
-        try:
-            data = response.json()
-        except ValueError:
-            print("Received a non-JSON response from the server.")
-            print(f"Raw response: {response.text}")
-            return
-        
-        response = requests.get(f'{BASE_URL}/module-instances/', headers={'Authorization': f'Token {token}'})
-        if response.status_code == 200:
-            module_instances = response.json()
-        else:
-            print("Failed to retrieve module instances.")
+        if response.status_code != 200:
+            print("Failed to retrieve module instance.")
             return
+        matching_instance = response.json()
     except Exception as e:
-        print("Error retrieving module instances:", e)
+        print("Error retrieving module instance:", e)
         return
 
-    matching_instance = None
-    for instance in module_instances:
-        if instance.get('module_code') == module_code and instance.get('year') == year and instance.get('semester') == semester:
-            matching_instance = instance
-            break
-
-    if not matching_instance:
-        print(f"No module instance found for {module_code} in {year} semester {semester}.")
-        return
-    
     if professor_id not in matching_instance.get('professors', []):
         print(f"Professor {professor_id} did not teach {module_code} in {year} semester {semester}.")
         return
@@ -307,9 +322,9 @@ def rate_professor(command):
     }
 
     try:
-        response = requests.post(f'{BASE_URL}/rate/', json=data, headers={'Authorization': f'Token {token}'})
-        if response.status_code == 200:
-            print("Rating submitted successfully!")
+        response = get_session().post(f'{BASE_URL}/rate/', json=data, headers={'Authorization': f'Token {token}'}, timeout=TIMEOUT)
+        if response.status_code in (200, 201):
+            print(response.json().get('message', 'Rating submitted successfully!'))
         elif response.status_code == 401:
             print("Command failed:", response.json().get('error', 'Unknown error'))
         else:
@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -20,7 +23,7 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # See https://docs.djangoproject.com/en/5.1/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure-*6ipn2r*yi5_+nqbf(d-7*y6)^q!v(7l)xvdqa)t$ikp8*7+$$'
+SECRET_KEY = os.environ.get('CWK1_SECRET_KEY', 'django-insecure-*6ipn2r*yi5_+nqbf(d-7*y6)^q!v(7l)xvdqa)t$ikp8*7+$$')
 
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = True
@@ -43,6 +46,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'myapp.middleware.ServerTimingMiddleware',
+    'myapp.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -76,13 +81,70 @@ WSGI_APPLICATION = 'cwk1.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# Selected with CWK1_DB_PROFILE: 'sqlite' (default) or 'postgres'. Connections
+# are kept open for CWK1_CONN_MAX_AGE seconds, so per-connection setup (the
+# SQLite pragmas in myapp/db.py, PostgreSQL handshakes) is not paid per request.
+
+DB_PROFILE = os.environ.get('CWK1_DB_PROFILE', 'sqlite')
+
+CONN_MAX_AGE = int(os.environ.get('CWK1_CONN_MAX_AGE', 60))
+
+if DB_PROFILE == 'postgres':
+    # CWK1_PG_POOL_MAX_SIZE > 0 switches to a psycopg connection pool (needs
+    # psycopg[pool]); pooled connections replace persistent ones.
+    PG_POOL_MAX_SIZE = int(os.environ.get('CWK1_PG_POOL_MAX_SIZE', 0))
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('CWK1_PG_NAME', 'cwk1'),
+            'USER': os.environ.get('CWK1_PG_USER', 'cwk1'),
+            'PASSWORD': os.environ.get('CWK1_PG_PASSWORD', ''),
+            'HOST': os.environ.get('CWK1_PG_HOST', 'localhost'),
+            'PORT': os.environ.get('CWK1_PG_PORT', '5432'),
+            'CONN_MAX_AGE': 0 if PG_POOL_MAX_SIZE else CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'pool': {
+                    'min_size': int(os.environ.get('CWK1_PG_POOL_MIN_SIZE', 2)),
+                    'max_size': PG_POOL_MAX_SIZE,
+                    'timeout': 10,
+                },
+            } if PG_POOL_MAX_SIZE else {},
+        }
+    }
+elif DB_PROFILE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            # CWK1_SQLITE_PATH points the app at another database file (e.g. a seeded benchmark copy).
+            'NAME': os.environ.get('CWK1_SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': CONN_MAX_AGE,
+            'OPTIONS': {
+                # Take the write lock when a transaction starts, so a transaction that reads
+                # before writing waits up to `timeout` instead of failing with "database is locked".
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': 5,  # seconds to wait for the write lock
+            },
+        }
     }
+else:
+    raise ImproperlyConfigured(f"Unknown CWK1_DB_PROFILE {DB_PROFILE!r}; use 'sqlite' or 'postgres'.")
+
+# Applied to every new SQLite connection (see myapp/db.py).
+SQLITE_PRAGMAS = {
+    'mmap_size': 256 * 1024 * 1024,
 }
 
+# CWK1_SQLITE_WAL=1 switches the database to write-ahead logging: readers no
+# longer block the writer, and vice versa. The journal mode is stored in the
+# database file itself (and adds -wal/-shm files next to it), so it is opt-in
+# for deployments rather than applied to the checked-in development database.
+if os.environ.get('CWK1_SQLITE_WAL', '0') == '1':
+    SQLITE_PRAGMAS.update({
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',  # fsync at checkpoints rather than every commit; safe with WAL
+    })
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -124,3 +186,213 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Caches. Signed-token revocations, shared throttle buckets and shared catalogue
+# snapshots live here. The default local-memory cache is private to each
+# process; with several worker processes point CWK1_CACHE_BACKEND and
+# CWK1_CACHE_LOCATION at a shared one, e.g.
+# django.core.cache.backends.redis.RedisCache with redis://127.0.0.1:6379, or
+# django.core.cache.backends.filebased.FileBasedCache with a directory.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CWK1_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CWK1_CACHE_LOCATION', ''),
+    }
+}
+
+# Backends that do not share entries between processes.
+PROCESS_LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+# Token authentication cache (see myapp/auth_cache.py)
+
+TOKEN_CACHE_SIZE = 10000
+
+TOKEN_CACHE_TTL = 30  # seconds
+
+# The cache is per worker process. Logout, token deletion and deactivation
+# reach the other workers through a per-user marker in this shared cache,
+# checked on every hit. With a process-local default cache there is nothing
+# to share (None): other workers may then accept the old token for up to
+# TOKEN_CACHE_TTL seconds.
+TOKEN_CACHE_GENERATION_CACHE = None if CACHES['default']['BACKEND'] in PROCESS_LOCAL_CACHE_BACKENDS else 'default'
+
+
+# Authentication tokens. AUTH_TOKEN_MODE picks what login issues: 'db'
+# (rest_framework authtoken rows) or 'signed' (stateless HMAC-signed tokens,
+# see myapp/signed_tokens.py). Database tokens are accepted in both modes, so
+# switching to 'signed' logs nobody out; signed tokens are only accepted in
+# 'signed' mode. They are signed with SECRET_KEY, which must then come from
+# CWK1_SECRET_KEY: anyone holding the key can mint a token for any user.
+
+AUTH_TOKEN_MODE = os.environ.get('CWK1_AUTH_TOKEN_MODE', 'db')
+
+if AUTH_TOKEN_MODE not in ('db', 'signed'):
+    raise ImproperlyConfigured(f"CWK1_AUTH_TOKEN_MODE must be 'db' or 'signed', not {AUTH_TOKEN_MODE!r}.")
+
+if AUTH_TOKEN_MODE == 'signed' and SECRET_KEY.startswith('django-insecure-'):
+    raise ImproperlyConfigured("Signed tokens need a private SECRET_KEY; set CWK1_SECRET_KEY.")
+
+SIGNED_TOKEN_MAX_AGE = 24 * 60 * 60  # seconds
+
+# Cache holding signed-token revocations (logout, deactivation). It must be
+# shared by every worker, or a logout would only take effect in the worker
+# that handled it, so signed mode refuses to start with a process-local one.
+SIGNED_TOKEN_REVOCATION_CACHE = 'default'
+
+if AUTH_TOKEN_MODE == 'signed' and CACHES[SIGNED_TOKEN_REVOCATION_CACHE]['BACKEND'] in PROCESS_LOCAL_CACHE_BACKENDS:
+    raise ImproperlyConfigured(
+        "Signed tokens need a revocation cache shared by all workers; set CWK1_CACHE_BACKEND and CWK1_CACHE_LOCATION "
+        "(e.g. django.core.cache.backends.redis.RedisCache and redis://127.0.0.1:6379)."
+    )
+
+
+# Batch rating submission (POST /api/rate/batch/)
+
+RATING_BATCH_MAX_SIZE = 1000
+
+
+# Keyset pagination for list endpoints (?cursor=&limit=)
+
+PAGE_SIZE_DEFAULT = 100
+
+PAGE_SIZE_MAX = 500
+
+STREAM_CHUNK_SIZE = 2000  # rows per chunk for ?stream=1 responses
+
+
+# Pre-encoded catalogue snapshots (see myapp/snapshots.py). With
+# CATALOGUE_SNAPSHOTS, ?stream=1 on professors/ and module-instances/ is
+# served from bytes built (and gzip/brotli-compressed) once per catalogue
+# version; without it the full module-instance list is streamed in constant
+# memory instead. Paginated requests are not snapshotted.
+# CATALOGUE_SNAPSHOT_CACHE names a cache in CACHES to share the snapshots
+# between workers (None: each worker builds its own).
+
+CATALOGUE_SNAPSHOTS = True
+
+CATALOGUE_SNAPSHOT_CACHE = None
+
+CATALOGUE_SNAPSHOT_TIMEOUT = 3600  # seconds a shared snapshot is kept
+
+
+# Server-Timing instrumentation (see myapp/middleware.py)
+
+SERVER_TIMING_SAMPLE_RATE = 1.0  # fraction of requests measured
+
+SERVER_TIMING_LOG = False  # also log one JSON line per measured request on the 'myapp.timing' logger
+
+# Sends the 'myapp.timing' lines to stderr, one JSON object per line. Point
+# the handler elsewhere (a file, syslog) to collect them.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'timing': {'class': 'logging.StreamHandler', 'formatter': 'message'},
+    },
+    'loggers': {
+        'myapp.timing': {'handlers': ['timing'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
+
+# Password hashing (see myapp/hashing.py and myapp/hashers.py)
+
+HASHING_MAX_CONCURRENCY = int(os.environ.get('CWK1_HASHING_MAX_CONCURRENCY', 2))  # threads, i.e. cores, spent hashing
+
+HASHING_QUEUE_DEPTH = int(os.environ.get('CWK1_HASHING_QUEUE_DEPTH', 16))  # logins allowed to wait; more get a 503
+
+HASHING_QUEUE_TIMEOUT = 5  # seconds a login waits for its password check (queueing plus hashing) before a 503
+
+HASHING_RETRY_AFTER = 1  # Retry-After seconds sent with those 503s
+
+# CWK1_PASSWORD_HASHER_PROFILE: 'default' keeps Django's hashers; 'pbkdf2' hashes
+# new and upgraded passwords with PBKDF2_ITERATIONS rounds of PBKDF2-SHA256.
+PASSWORD_HASHER_PROFILE = os.environ.get('CWK1_PASSWORD_HASHER_PROFILE', 'default')
+
+PBKDF2_ITERATIONS = int(os.environ.get('CWK1_PBKDF2_ITERATIONS', 600000))
+
+if PASSWORD_HASHER_PROFILE == 'pbkdf2':
+    PASSWORD_HASHERS = [
+        'myapp.hashers.ConfigurablePBKDF2PasswordHasher',
+        'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+        'django.contrib.auth.hashers.Argon2PasswordHasher',
+        'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+        'django.contrib.auth.hashers.ScryptPasswordHasher',
+    ]
+elif PASSWORD_HASHER_PROFILE != 'default':
+    raise ImproperlyConfigured(f"Unknown CWK1_PASSWORD_HASHER_PROFILE {PASSWORD_HASHER_PROFILE!r}; use 'default' or 'pbkdf2'.")
+
+
+# Request throttling (see myapp/throttling.py). Every request takes a token
+# from its client IP's bucket for the view's scope (THROTTLE_IP_RATES), before
+# any token lookup; once the auth token is validated, the request also takes
+# one from the user's bucket (THROTTLE_RATES). 'N/s|m|h|d' allows bursts of N
+# and N per period on average. Scopes not listed use 'default'; a scope mapped
+# to None is not throttled.
+
+THROTTLE_ENABLED = os.environ.get('CWK1_THROTTLE_ENABLED', '1') == '1'
+
+THROTTLE_RATES = {
+    'default': '20/s',
+    'read': '50/s',  # professors/, module-instances/, ratings/
+    'average': '20/s',
+    'averages': '5/s',
+    'rate': '5/s',
+    'rate_batch': '1/s',
+    'analytics': '2/s',
+}
+
+# Per IP, so several users behind one address (NAT, proxies) share these.
+THROTTLE_IP_RATES = {
+    'default': '100/s',
+    'login': '10/m',
+    'register': '5/m',
+}
+
+# 'memory' keeps buckets per process; 'cache' shares them between workers
+# through the THROTTLE_CACHE cache (e.g. a FileBasedCache or Redis).
+THROTTLE_STORE = os.environ.get('CWK1_THROTTLE_STORE', 'memory')
+
+THROTTLE_CACHE = 'default'
+
+THROTTLE_MAX_KEYS = 100000  # buckets kept by the memory store
+
+
+# Response compression (see myapp.middleware.CompressionMiddleware). Brotli is
+# used when the brotli package is installed and the client accepts it, gzip
+# otherwise. Plain responses smaller than COMPRESSION_MIN_SIZE bytes are sent
+# as they are; streamed responses are always compressed.
+
+COMPRESSION_MIN_SIZE = 1024
+
+COMPRESSION_CONTENT_TYPES = ('application/json', 'text/')
+
+COMPRESSION_GZIP_LEVEL = 6
+
+COMPRESSION_BROTLI_QUALITY = 4  # 11 is the maximum, but far too slow per request
+
+
+# Response encoding (see myapp/renderers.py): 'auto' uses orjson when it is
+# installed and the stdlib json module otherwise; 'orjson' or 'stdlib' forces
+# one. MessagePack is offered to clients sending Accept: application/msgpack
+# when the msgpack package is installed.
+
+JSON_BACKEND = os.environ.get('CWK1_JSON_BACKEND', 'auto')
+
+
+# Ratings analytics (see myapp/analytics.py; needs NumPy). The staff-only
+# analytics/ratings/ endpoint loads new ratings at most every
+# ANALYTICS_MAX_AGE seconds unless asked to with ?refresh=1.
+
+ANALYTICS_MAX_AGE = 10  # seconds
+
+ANALYTICS_CHUNK_SIZE = 50000  # ratings read per query batch when loading
@@ -0,0 +1,135 @@
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+
+from .models import ModuleInstance, ProfessorInstanceAggregate, ProfessorModuleAggregate, Rating, RatingsVersion
+
+
+STAR_FIELDS = [f'stars_{star}' for star in range(1, 6)]
+
+
+# ------------------------------------------------------------------------
+# Incremental Maintenance
+# ------------------------------------------------------------------------
+
+def _bump(model, keys, rating, delta):
+    """Add `delta` ratings of value `rating` to the aggregate row identified by `keys`."""
+    changes = {
+        'count': F('count') + delta,
+        'total': F('total') + delta * rating,
+        f'stars_{rating}': F(f'stars_{rating}') + delta,
+    }
+    if model.objects.filter(**keys).update(**changes) or delta < 0:
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**keys, count=delta, total=delta * rating, **{f'stars_{rating}': delta})
+    except IntegrityError:
+        # Another transaction created the row first; add to it instead.
+        model.objects.filter(**keys).update(**changes)
+
+
+def apply_ratings(rows, delta=1):
+    """
+    Add (delta=1) or remove (delta=-1) ratings from the aggregate tables.
+
+    `rows` is an iterable of (professor_id, module_instance_id, module_id, rating)
+    tuples; identical rows are folded together so each aggregate row is touched once.
+    Removing a rating (its old value on a change, or a deletion) also bumps the
+    ratings version.
+    """
+    rows = Counter(rows)
+    for (professor_id, module_instance_id, module_id, rating), n in rows.items():
+        _bump(ProfessorInstanceAggregate, {'professor_id': professor_id, 'module_instance_id': module_instance_id}, rating, delta * n)
+        _bump(ProfessorModuleAggregate, {'professor_id': professor_id, 'module_id': module_id}, rating, delta * n)
+    if rows and delta < 0:
+        bump_ratings_version()
+
+
+def ratings_version():
+    """Return the ratings version counter (a single primary-key read)."""
+    return RatingsVersion.objects.filter(pk=1).values_list('version', flat=True).first() or 0
+
+
+def bump_ratings_version():
+    """Record that stored ratings changed in place, which appending by primary key cannot pick up."""
+    if not RatingsVersion.objects.filter(pk=1).update(version=F('version') + 1):
+        RatingsVersion.objects.get_or_create(pk=1, defaults={'version': 1})
+
+
+def rating_row(rating, module_id=None):
+    """
+    Return the aggregate key tuple for a Rating instance. The module comes from
+    `module_id`, else the cached module instance, else one primary-key query.
+    """
+    if module_id is None and Rating.module_instance.is_cached(rating):
+        module_id = rating.module_instance.module_id
+    if module_id is None:
+        module_id = ModuleInstance.objects.values_list('module_id', flat=True).get(pk=rating.module_instance_id)
+    return rating.professor_id, rating.module_instance_id, module_id, int(rating.rating)
+
+
+# ------------------------------------------------------------------------
+# Rebuild and Drift Check
+# ------------------------------------------------------------------------
+
+def _aggregate_fields():
+    return {
+        'count': Count('id'),
+        'total': Sum('rating'),
+        **{f'stars_{star}': Count('id', filter=Q(rating=star)) for star in range(1, 6)},
+    }
+
+
+def compute_instance_aggregates():
+    """Return {(professor_id, module_instance_id): values} computed from Rating."""
+    rows = Rating.objects.values('professor_id', 'module_instance_id').annotate(**_aggregate_fields()).order_by()
+    return {(row.pop('professor_id'), row.pop('module_instance_id')): row for row in rows}
+
+
+def compute_module_aggregates():
+    """Return {(professor_id, module_id): values} computed from Rating."""
+    rows = Rating.objects.values('professor_id', 'module_instance__module_id').annotate(**_aggregate_fields()).order_by()
+    return {(row.pop('professor_id'), row.pop('module_instance__module_id')): row for row in rows}
+
+
+def _stored(model, key_fields):
+    fields = ['count', 'total', *STAR_FIELDS]
+    return {
+        tuple(row[field] for field in key_fields): {field: row[field] for field in fields}
+        for row in model.objects.filter(count__gt=0).values(*key_fields, *fields)
+    }
+
+
+def find_drift():
+    """Return a list of (table, key, stored, expected) for every aggregate row that disagrees with Rating."""
+    drift = []
+    checks = [
+        (ProfessorInstanceAggregate, ('professor_id', 'module_instance_id'), compute_instance_aggregates()),
+        (ProfessorModuleAggregate, ('professor_id', 'module_id'), compute_module_aggregates()),
+    ]
+    for model, key_fields, expected in checks:
+        stored = _stored(model, key_fields)
+        for key in stored.keys() | expected.keys():
+            if stored.get(key) != expected.get(key):
+                drift.append((model._meta.db_table, key, stored.get(key), expected.get(key)))
+    return drift
+
+
+@transaction.atomic
+def rebuild():
+    """Recompute both aggregate tables from Rating. Returns the number of rows written."""
+    ProfessorInstanceAggregate.objects.all().delete()
+    ProfessorModuleAggregate.objects.all().delete()
+    instance_rows = [
+        ProfessorInstanceAggregate(professor_id=professor_id, module_instance_id=module_instance_id, **values)
+        for (professor_id, module_instance_id), values in compute_instance_aggregates().items()
+    ]
+    module_rows = [
+        ProfessorModuleAggregate(professor_id=professor_id, module_id=module_id, **values)
+        for (professor_id, module_id), values in compute_module_aggregates().items()
+    ]
+    ProfessorInstanceAggregate.objects.bulk_create(instance_rows, batch_size=1000)
+    ProfessorModuleAggregate.objects.bulk_create(module_rows, batch_size=1000)
+    return len(instance_rows) + len(module_rows)
@@ -0,0 +1,269 @@
+import threading
+import time
+
+from django.conf import settings
+
+from .aggregates import ratings_version
+from .catalogue import current_version
+from .models import Professor, Rating
+
+try:
+    import numpy as np
+except ImportError:  # Optional: the analytics endpoint and command report it as unavailable.
+    np = None
+
+# Dimensions a breakdown can group or filter by ('module' is the module code, 'instance' a module instance id).
+DIMENSIONS = ('year', 'semester', 'module', 'professor', 'instance')
+
+# Columns read from the database per rating, in load order.
+FIELDS = ('id', 'rating', 'professor_id', 'module_instance__module_id', 'module_instance_id',
+          'module_instance__year', 'module_instance__semester')
+
+
+class AnalyticsUnavailable(Exception):
+    """Raised when NumPy is not installed."""
+
+
+def available():
+    return np is not None
+
+
+class Dictionary:
+    """Dictionary encoding of string keys (professor ids, module codes) as dense int32 codes."""
+
+    def __init__(self):
+        self.labels = []
+        self._codes = {}
+
+    def encode(self, values):
+        codes = self._codes
+        for value in values:
+            if value not in codes:
+                codes[value] = len(self.labels)
+                self.labels.append(value)
+        return np.fromiter((codes[value] for value in values), dtype=np.int32, count=len(values))
+
+    def code(self, value):
+        """Return the code for `value`, or -1 if it has never been seen (so filters on it match nothing)."""
+        return self._codes.get(value, -1)
+
+
+class RatingColumns:
+    """
+    Every Rating held as NumPy columns: int8 ratings, int32 dictionary-encoded
+    professor and module keys, int32 module instance ids and years, int8
+    semesters, plus the int64 primary keys (about 26 bytes per rating).
+
+    refresh() appends only ratings with a primary key above the last one
+    loaded. Ratings changed or deleted in place do not show up that way, so
+    it reloads everything when the ratings version (bumped by every such
+    change, see aggregates.apply_ratings) or the catalogue version (an
+    instance's year or module may have changed) has moved on. Both are
+    single-row reads. Appending by primary key assumes ratings commit in key
+    order, which holds on SQLite (one writer at a time) but not always under
+    concurrent writers on other databases.
+    """
+
+    def __init__(self, chunk_size=50000):
+        if np is None:
+            raise AnalyticsUnavailable('NumPy is required for ratings analytics.')
+        self.chunk_size = chunk_size
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.professors = Dictionary()
+        self.modules = Dictionary()
+        self.catalogue_version = None
+        self.ratings_version = None
+        self.refreshed_at = None
+        self.columns = {
+            'id': np.empty(0, dtype=np.int64),
+            'rating': np.empty(0, dtype=np.int8),
+            'professor': np.empty(0, dtype=np.int32),
+            'module': np.empty(0, dtype=np.int32),
+            'instance': np.empty(0, dtype=np.int32),
+            'year': np.empty(0, dtype=np.int32),
+            'semester': np.empty(0, dtype=np.int8),
+        }
+
+    def __len__(self):
+        return len(self.columns['id'])
+
+    def nbytes(self):
+        return sum(column.nbytes for column in self.columns.values())
+
+    def _load(self, after):
+        """Append the ratings with a primary key above `after`; return how many there were."""
+        rows = Rating.objects.filter(id__gt=after).order_by('id').values_list(*FIELDS)
+        loaded, chunk = 0, []
+        for row in rows.iterator(chunk_size=self.chunk_size):
+            chunk.append(row)
+            if len(chunk) == self.chunk_size:
+                loaded += self._append(chunk)
+                chunk = []
+        if chunk:
+            loaded += self._append(chunk)
+        return loaded
+
+    def _append(self, rows):
+        ids, ratings, professors, modules, instances, years, semesters = zip(*rows)
+        new = {
+            'id': np.array(ids, dtype=np.int64),
+            'rating': np.array(ratings, dtype=np.int8),
+            'professor': self.professors.encode(professors),
+            'module': self.modules.encode(modules),
+            'instance': np.array(instances, dtype=np.int32),
+            'year': np.array(years, dtype=np.int32),
+            'semester': np.array(semesters, dtype=np.int8),
+        }
+        self.columns = {name: np.concatenate((self.columns[name], new[name])) for name in self.columns}
+        return len(rows)
+
+    def refresh(self, max_age=0):
+        """
+        Bring the columns up to date, unless they were refreshed less than
+        `max_age` seconds ago; return {'mode': 'full'|'incremental'|'cached',
+        'loaded': rows read, 'rows': total}.
+        """
+        with self._lock:
+            if self.refreshed_at is not None and time.monotonic() - self.refreshed_at < max_age:
+                return {'mode': 'cached', 'loaded': 0, 'rows': len(self)}
+            # Read before loading: a change made while loading moves the version on for next time.
+            versions = (current_version(), ratings_version())
+            last_id = int(self.columns['id'][-1]) if len(self) else 0
+            if versions == (self.catalogue_version, self.ratings_version):
+                mode = 'incremental'
+            else:
+                self._reset()
+                mode, last_id = 'full', 0
+            self.catalogue_version, self.ratings_version = versions
+            loaded = self._load(last_id)
+            self.refreshed_at = time.monotonic()
+            return {'mode': mode, 'loaded': loaded, 'rows': len(self)}
+
+    # --------------------------------------------------------------------
+    # Queries
+    # --------------------------------------------------------------------
+
+    def _mask(self, filters):
+        """Return a boolean mask of the ratings matching {dimension: value} filters."""
+        columns, mask = self.columns, np.ones(len(self), dtype=bool)
+        for name, value in filters.items():
+            if name == 'professor':
+                value = self.professors.code(value)
+            elif name == 'module':
+                value = self.modules.code(value)
+            mask &= columns[name] == int(value)
+        return mask
+
+    def group_stats(self, by=(), filters=None, percentiles=(25, 50, 75)):
+        """
+        Return rating statistics for each combination of the `by` dimensions
+        (everything as one group if empty), over the ratings matching `filters`:
+        count, mean, population standard deviation, min, max, the requested
+        percentiles (linear interpolation, as numpy.percentile) and the number
+        of ratings per star. Groups come back sorted by their key values.
+        """
+        with self._lock:
+            mask = self._mask(filters or {})
+            ratings = self.columns['rating'][mask]
+            keys = [self.columns[name][mask] for name in by]
+            # Taken with the columns: a full refresh replaces the dictionaries.
+            dictionaries = {'professor': self.professors, 'module': self.modules}
+        if not len(ratings):
+            return []
+
+        unique, group = _group(keys, len(ratings))
+        groups = unique.shape[1]
+
+        # Ratings only take the values 1-5, so one pass builds each group's star
+        # histogram and every statistic follows from it: exact integer sums for
+        # the mean and variance, and for order statistics the k-th smallest
+        # rating (from 0) is one more than the number of stars whose cumulative
+        # count is still <= k.
+        stars = np.bincount(group * 5 + (ratings - 1), minlength=groups * 5).reshape(groups, 5)
+        values = np.arange(1, 6, dtype=np.int64)
+        counts = stars.sum(axis=1)
+        means = (stars @ values) / counts
+        variances = np.maximum((stars @ values ** 2) / counts - means ** 2, 0)
+        cumulative = np.cumsum(stars, axis=1)
+
+        def kth(k):
+            return 1 + (cumulative <= k[:, None]).sum(axis=1)
+
+        last = counts - 1
+        mins, maxes = kth(np.zeros(groups, dtype=np.int64)), kth(last)
+        quantiles = {}
+        for p in percentiles:
+            position = last * (p / 100)
+            lower = np.floor(position).astype(np.int64)
+            below, above = kth(lower), kth(np.minimum(lower + 1, last))
+            quantiles[p] = below + (above - below) * (position - lower)
+
+        results = [
+            {
+                **{
+                    name: dictionaries[name].labels[unique[i, g]] if name in dictionaries else int(unique[i, g])
+                    for i, name in enumerate(by)
+                },
+                'count': int(counts[g]),
+                'mean': round(float(means[g]), 3),
+                'std': round(float(np.sqrt(variances[g])), 3),
+                'min': int(mins[g]),
+                'max': int(maxes[g]),
+                **{f'p{p:g}': round(float(quantile[g]), 3) for p, quantile in quantiles.items()},
+                'stars': {str(star): int(stars[g, star - 1]) for star in range(1, 6)},
+            }
+            for g in range(groups)
+        ]
+        results.sort(key=lambda result: tuple(result[name] for name in by))
+        return results
+
+
+def _group(keys, size):
+    """
+    Number the distinct combinations of `keys` (equal-length integer arrays).
+
+    Returns (unique, group): unique[i, g] is the value of keys[i] in group g,
+    and group[j] the group of row j. The keys are packed into one int64 per
+    row, so a single 1-D np.unique does the work (much faster than np.unique
+    with axis=1).
+    """
+    if not keys:
+        return np.empty((0, 1), dtype=np.int64), np.zeros(size, dtype=np.intp)
+    lows = [int(key.min()) for key in keys]
+    spans = [int(key.max()) - low + 1 for key, low in zip(keys, lows)]
+    packed = np.zeros(size, dtype=np.int64)
+    for key, low, span in zip(keys, lows, spans):
+        packed = packed * span + (key - low)
+    codes, group = np.unique(packed, return_inverse=True)
+
+    unique = np.empty((len(keys), len(codes)), dtype=np.int64)
+    for i in reversed(range(len(keys))):
+        codes, unique[i] = np.divmod(codes, spans[i])
+        unique[i] += lows[i]
+    return unique, group.reshape(-1)
+
+
+def professor_names(results):
+    """Add 'professor_name' to each result grouped by professor."""
+    if results and 'professor' in results[0]:
+        names = dict(Professor.objects.filter(id__in={r['professor'] for r in results}).values_list('id', 'name'))
+        for result in results:
+            result['professor_name'] = names.get(result['professor'])
+    return results
+
+
+_columns = None
+_columns_lock = threading.Lock()
+
+
+def get_columns():
+    """Return the process-wide RatingColumns, created on first use; raises AnalyticsUnavailable without NumPy."""
+    global _columns
+    if _columns is None:
+        with _columns_lock:
+            if _columns is None:
+                _columns = RatingColumns(chunk_size=getattr(settings, 'ANALYTICS_CHUNK_SIZE', 50000))
+    return _columns
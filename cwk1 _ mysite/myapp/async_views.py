@@ -0,0 +1,179 @@
+from functools import partial
+
+from django.conf import settings
+from django.db.models import Sum
+from django.http import JsonResponse, StreamingHttpResponse
+from django.shortcuts import aget_object_or_404
+from rest_framework.authtoken.models import Token
+from . import renderers, signed_tokens
+from .auth_cache import token_cache
+from .catalogue import acurrent_version, catalogue_etag
+from .middleware import compress
+from .snapshots import catalogue_snapshots
+from .pagination import InvalidPage, akeyset_page
+from .throttling import throttle
+from .timing import phase, timed
+from .models import Professor, Module, ModuleInstance, Rating, ProfessorInstanceAggregate
+from .views import (
+    INSTANCE_FIELDS, RATING_FIELDS, auth_token_key, authorize_cached_user, build_instance_rows, instance_batches,
+    json_response, professor_batches, professor_links, snapshot_build, snapshot_coding, snapshot_key, snapshot_response,
+    with_etag,
+)
+
+
+# Async (ASGI) variants of the read endpoints in views.py. They return the
+# same payloads, but await the ORM instead of holding a worker thread while
+# the database or a slow client is busy.
+
+
+# ------------------------------------------------------------------------
+# Utility Functions
+# ------------------------------------------------------------------------
+
+@timed('auth')
+async def atoken_required(request):
+    """Async variant of views.token_required."""
+    token_key = auth_token_key(request)
+    if token_key is None:
+        return JsonResponse({'error': 'Authentication token required. Please log in.'}, status=401)
+
+    if signed_tokens.is_signed(token_key):
+        cached = await signed_tokens.averify(token_key) if signed_tokens.enabled() else None
+        if cached is None:
+            return JsonResponse({'error': 'Invalid token or token expired. Please log in again.'}, status=401)
+        return authorize_cached_user(request, cached)
+
+    cached = token_cache.get(token_key)
+    if cached is None:
+        try:
+            token = await Token.objects.select_related('user').aget(key=token_key)
+        except Token.DoesNotExist:
+            return JsonResponse({'error': 'Invalid token or token expired. Please log in again.'}, status=401)
+        cached = (token.user.id, token.user.username, token.user.is_active)
+        token_cache.set(token_key, *cached)
+    return authorize_cached_user(request, cached)
+
+
+async def aserve_snapshot(request, resource, version, batches):
+    """Async variant of views.serve_snapshot; building and compressing a snapshot run on the sync thread."""
+    coding = snapshot_coding(request)
+    with phase('serialize'):
+        snapshot = await catalogue_snapshots.aget(
+            snapshot_key(request, resource), version, snapshot_build(request, batches), coding, partial(compress, coding),
+        )
+    return snapshot_response(version, snapshot, coding)
+
+
+async def apaginated_response(queryset, request, transform=None):
+    """Async variant of views.paginated_response."""
+    try:
+        rows, next_cursor = await akeyset_page(queryset, request)
+    except InvalidPage as e:
+        return json_response({'error': str(e)}, status=400)
+    if transform:
+        rows = await transform(rows)
+    return json_response({'results': rows, 'next': next_cursor}, status=200, request=request)
+
+
+async def ainstance_rows(instances):
+    """Async variant of views.instance_rows."""
+    return build_instance_rows(instances, [link async for link in professor_links(instances)])
+
+
+# ------------------------------------------------------------------------
+# Data Retrieval Views
+# ------------------------------------------------------------------------
+
+@throttle('read')
+async def professor_list(request):
+    """List professors, one keyset page at a time, or all of them with ?stream=1."""
+    token_check = await atoken_required(request)
+    if token_check is not True:
+        return token_check
+
+    version = await acurrent_version()
+    etag, not_modified = catalogue_etag(request, 'professors', version=version)
+    if not_modified:
+        return not_modified
+
+    if request.GET.get('stream') == '1':
+        if getattr(settings, 'CATALOGUE_SNAPSHOTS', True):
+            return with_etag(await aserve_snapshot(request, 'professors', version, professor_batches), etag)
+        rows = [row async for row in Professor.objects.values('id', 'name').order_by('id')]
+        return with_etag(json_response({'results': rows, 'next': None}, status=200, request=request), etag)
+
+    professors = Professor.objects.values('id', 'name')
+    return with_etag(await apaginated_response(professors, request), etag)
+
+
+@throttle('read')
+async def module_instance_list(request):
+    """List module instances, one keyset page at a time, or all of them with ?stream=1."""
+    token_check = await atoken_required(request)
+    if token_check is not True:
+        return token_check
+
+    version = await acurrent_version()
+    etag, not_modified = catalogue_etag(request, 'module-instances', version=version)
+    if not_modified:
+        return not_modified
+
+    instances = ModuleInstance.objects.values(*INSTANCE_FIELDS)
+    if request.GET.get('stream') == '1':
+        if getattr(settings, 'CATALOGUE_SNAPSHOTS', True):
+            return with_etag(await aserve_snapshot(request, 'module-instances', version, instance_batches), etag)
+        chunk_size = getattr(settings, 'STREAM_CHUNK_SIZE', 2000)
+
+        async def encode():
+            yield b'{"results": ['
+            separator, chunk = b'', []
+            async for instance in instances.order_by('id').aiterator(chunk_size=chunk_size):
+                chunk.append(instance)
+                if len(chunk) == chunk_size:
+                    yield separator + b', '.join(renderers.dumps_json(row) for row in await ainstance_rows(chunk))
+                    separator, chunk = b', ', []
+            if chunk:
+                yield separator + b', '.join(renderers.dumps_json(row) for row in await ainstance_rows(chunk))
+            yield b'], "next": null}'
+
+        return with_etag(StreamingHttpResponse(encode(), content_type='application/json'), etag)
+    return with_etag(await apaginated_response(instances, request, transform=ainstance_rows), etag)
+
+
+@throttle('read')
+async def rating_list(request):
+    """List ratings by the logged-in user, one keyset page at a time."""
+    token_check = await atoken_required(request)
+    if token_check is not True:
+        return token_check
+
+    ratings = Rating.objects.filter(user_id=request.user.id).values(*RATING_FIELDS)
+    return await apaginated_response(ratings, request)
+
+
+# ------------------------------------------------------------------------
+# Rating Views
+# ------------------------------------------------------------------------
+
+@throttle('average')
+async def average_rating(request, professor_id, module_code):
+    """Get average rating for a professor in a module."""
+    token_check = await atoken_required(request)
+    if token_check is not True:
+        return token_check
+
+    # Only instances the professor still teaches count, as ratings outlive changes of teaching staff.
+    aggregate = await ProfessorInstanceAggregate.objects.filter(
+        professor_id=professor_id, module_instance__module_id=module_code, module_instance__professors=professor_id
+    ).aaggregate(count=Sum('count'), total=Sum('total'))
+    if aggregate['count']:
+        return json_response({'average_rating': round(aggregate['total'] / aggregate['count'], 1)}, status=200, request=request)
+
+    # No ratings recorded: work out which 404 applies.
+    professor = await aget_object_or_404(Professor, id=professor_id)
+    module = await aget_object_or_404(Module, code=module_code)
+
+    if not await ModuleInstance.objects.filter(module=module, professors=professor).aexists():
+        return json_response({'message': f"Professor {professor.name} does not teach {module.module_name}"}, status=404)
+
+    return json_response({'message': 'No ratings available.'}, status=404)
@@ -0,0 +1,100 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from . import timing
+
+
+class TokenCache:
+    """
+    Bounded LRU cache of token key -> (user id, username, is_active) with a TTL.
+
+    Each worker process has its own cache. So that invalidate_user() reaches
+    every worker, it also replaces the user's generation marker in the shared
+    Django cache `generation_alias`: entries remember the marker they were
+    cached under, and a hit whose marker has since changed counts as a miss.
+    Without a shared cache (generation_alias None) invalidation only reaches
+    this process, and the TTL bounds how long other workers accept the token.
+    """
+
+    def __init__(self, max_size=10000, ttl=300, generation_alias=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.generation_alias = generation_alias
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _generation(self, user_id):
+        if self.generation_alias is None:
+            return None
+        return caches[self.generation_alias].get(f'token-generation:{user_id}')
+
+    def get(self, key):
+        """Return the cached user tuple for a token key, or None on a miss."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < now:
+                del self._entries[key]
+                entry = None
+            elif entry is not None:
+                self._entries.move_to_end(key)
+        if entry is not None and self._generation(entry[1][0]) != entry[2]:
+            self.invalidate(key)  # Invalidated by another worker.
+            entry = None
+
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        timing.note('token_cache', 'miss' if entry is None else 'hit')
+        return None if entry is None else entry[1]
+
+    def set(self, key, user_id, username, is_active):
+        """Cache the user a token key belongs to."""
+        generation = self._generation(user_id)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, (user_id, username, is_active), generation)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        """Drop a single token key from this process."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate_user(self, user_id):
+        """Drop every cached token belonging to a user, in every worker sharing the generation cache."""
+        if self.generation_alias is not None:
+            # Outlives any entry cached under the previous marker; once it expires,
+            # entries cached under it see None and miss too.
+            caches[self.generation_alias].set(f'token-generation:{user_id}', time.time_ns(), timeout=2 * self.ttl)
+        with self._lock:
+            stale = [key for key, (_, user, _) in self._entries.items() if user[0] == user_id]
+            for key in stale:
+                del self._entries[key]
+
+    def clear(self):
+        """Drop every entry and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        """Return the hit/miss counters and current size."""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
+
+
+token_cache = TokenCache(
+    max_size=getattr(settings, 'TOKEN_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'TOKEN_CACHE_TTL', 30),
+    generation_alias=getattr(settings, 'TOKEN_CACHE_GENERATION_CACHE', None),
+)
@@ -0,0 +1,47 @@
+import hashlib
+
+from django.db.models import F
+from django.http import HttpResponseNotModified
+from django.utils.http import parse_etags
+
+from .models import CatalogueVersion
+from .renderers import negotiate
+
+
+def current_version():
+    """Return the catalogue version counter (a single primary-key read)."""
+    return CatalogueVersion.objects.filter(pk=1).values_list('version', flat=True).first() or 0
+
+
+def bump_version():
+    """Advance the catalogue version so cached representations are revalidated."""
+    if not CatalogueVersion.objects.filter(pk=1).update(version=F('version') + 1):
+        CatalogueVersion.objects.get_or_create(pk=1, defaults={'version': 1})
+
+
+async def acurrent_version():
+    """Async variant of current_version."""
+    return await CatalogueVersion.objects.filter(pk=1).values_list('version', flat=True).afirst() or 0
+
+
+def catalogue_etag(request, resource, version=None):
+    """
+    Return (etag, not_modified) for a catalogue resource.
+
+    The tag covers the catalogue version, the resource, the query string
+    (page cursor, limit, stream, shape) and the negotiated media type, so each
+    representation has its own tag.
+    `not_modified` is a 304 response when the client's If-None-Match already
+    holds the tag, otherwise None.
+    """
+    if version is None:
+        version = current_version()
+    key = f'{resource}:{version}:{negotiate(request)}:{request.GET.urlencode()}'
+    etag = '"%s"' % hashlib.sha1(key.encode()).hexdigest()[:20]
+    # Weak comparison, as for any If-None-Match: compressed responses carry W/"...".
+    client_tags = {tag.removeprefix('W/') for tag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))}
+    if etag in client_tags or '*' in client_tags:
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return etag, response
+    return etag, None
@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class ConfigurablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 with the iteration count taken from settings.PBKDF2_ITERATIONS.
+
+    It keeps the 'pbkdf2_sha256' algorithm name, so existing hashes still
+    verify (their iteration count is stored in the hash) and are re-hashed
+    with the configured count on the user's next login.
+    """
+
+    @property
+    def iterations(self):
+        return getattr(settings, 'PBKDF2_ITERATIONS', PBKDF2PasswordHasher.iterations)
@@ -0,0 +1,74 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from django.conf import settings
+from django.db import close_old_connections
+
+
+class HashingBusy(Exception):
+    """Raised when the password hashing executor is saturated."""
+
+
+class BoundedExecutor:
+    """
+    Run password hashing on at most `max_workers` threads, with at most
+    `queue_depth` further calls waiting; anything beyond that is rejected at
+    once with HashingBusy instead of piling up behind the CPU.
+
+    Threads are enough for real parallelism: hashlib's PBKDF2 releases the GIL
+    while it works, so the cap is on cores spent hashing.
+    """
+
+    def __init__(self, max_workers, queue_depth, timeout):
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='hashing')
+        self._slots = threading.BoundedSemaphore(max_workers + queue_depth)
+
+    def run(self, func, *args, **kwargs):
+        """Call func(*args, **kwargs) on the executor and return its result, or raise HashingBusy."""
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy('Too many password checks in progress.')
+        try:
+            future = self._pool.submit(_call_and_close, func, args, kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            future.cancel()
+            raise HashingBusy('Timed out waiting for the password check.')
+
+
+def _call_and_close(func, args, kwargs):
+    try:
+        return func(*args, **kwargs)
+    finally:
+        # Calls such as authenticate() query the database from the worker thread;
+        # treat each call like a request so CONN_MAX_AGE decides whether the
+        # thread's connection is kept.
+        close_old_connections()
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Return the process-wide executor, created from settings on first use."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = BoundedExecutor(
+                    max_workers=getattr(settings, 'HASHING_MAX_CONCURRENCY', 2),
+                    queue_depth=getattr(settings, 'HASHING_QUEUE_DEPTH', 16),
+                    timeout=getattr(settings, 'HASHING_QUEUE_TIMEOUT', 5),
+                )
+    return _executor
+
+
+def run(func, *args, **kwargs):
+    """Run a password hashing call on the bounded executor."""
+    return get_executor().run(func, *args, **kwargs)
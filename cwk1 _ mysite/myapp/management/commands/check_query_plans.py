@@ -0,0 +1,145 @@
+import json
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+
+from myapp.models import ModuleInstance, Rating
+from myapp.seeding import seed_sample
+from myapp.snapshots import catalogue_snapshots
+
+
+# SEARCH steps use an index to visit only matching rows; SCAN steps read a
+# whole table (or a whole index).
+FULL_SCAN = re.compile(r'^SCAN (?!CONSTANT ROW)')
+
+# Statements that are part of transaction bookkeeping rather than data access,
+# and plain INSERT ... VALUES, which reads no table. An INSERT ... SELECT (the
+# rating upsert) is still checked.
+SKIPPED = re.compile(r'^\s*(SAVEPOINT|RELEASE|ROLLBACK|BEGIN|COMMIT|INSERT INTO \S+ \([^)]*\) VALUES)\b', re.IGNORECASE)
+
+
+def explain(sql):
+    """Return the steps of SQLite's EXPLAIN QUERY PLAN for `sql`."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def full_scans(plan, allowed=None):
+    """Return the steps of `plan` that scan a whole table, other than scans of the `allowed` table."""
+    intended = re.compile(rf'^SCAN {allowed}\b') if allowed else None
+    return [step for step in plan if FULL_SCAN.search(step) and not (intended and intended.search(step))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Run every API view against a freshly seeded test database, capture the EXPLAIN QUERY PLAN "
+        "of each query, and fail if any of them falls back to a full table scan."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--professors', type=int, default=200)
+        parser.add_argument('--modules', type=int, default=50)
+        parser.add_argument('--instances', type=int, default=400)
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=0, help="Random seed for the generated data.")
+        parser.add_argument('--verbose-plans', action='store_true', help="Print the plan of every query, not just failures.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("Query plan checks use SQLite's EXPLAIN QUERY PLAN; run them against the SQLite profile.")
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self.seed(options)
+            failures = self.check_views(options['verbose_plans'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        if failures:
+            raise CommandError(f"{failures} queries fall back to a full table scan.")
+        self.stdout.write(self.style.SUCCESS("No full table scans in the API's queries."))
+
+    def seed(self, options):
+        seed_sample(
+            professors=options['professors'], modules=options['modules'], instances=options['instances'],
+            users=options['users'], seed=options['seed'],
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    # --------------------------------------------------------------------
+    # Plan Checks
+    # --------------------------------------------------------------------
+
+    def requests(self, client, headers):
+        """
+        Yield (label, thunk, allowed) triples covering every API view.
+
+        `allowed` names the table a request scans on purpose, or is None: a
+        first page is an ordered scan that stops after LIMIT rows, and
+        ?stream=1 and the unfiltered averages matrix read the whole table by
+        design. Only scans of that table are let through; the request's other
+        queries (token and catalogue version lookups, ...) are still checked.
+        """
+        instance = ModuleInstance.objects.select_related('module').order_by('id').last()
+        professor_id = instance.professors.values_list('id', flat=True).first()
+        untaught = ModuleInstance.objects.exclude(professors=professor_id).order_by('id').first()
+        rated = Rating.objects.filter(user__username='user0').order_by('id').first()
+
+        def get(url):
+            return lambda: client.get(url, **headers)
+
+        def get_full(url):
+            # Drop any catalogue snapshot first, so the queries that build it are checked.
+            return lambda: (catalogue_snapshots.invalidate(), client.get(url, **headers).getvalue())
+
+        def post(url, data):
+            return lambda: client.post(url, json.dumps(data), content_type='application/json', **headers)
+
+        yield 'login', lambda: client.post('/api/login/', json.dumps({'username': 'user0', 'password': 'password'}), content_type='application/json'), None
+        yield 'professors', get('/api/professors/?limit=20'), 'myapp_professor'
+        yield 'professors (cursor)', get('/api/professors/?limit=20&cursor=IlA1MCI'), None
+        yield 'professors (stream)', get_full('/api/professors/?stream=1'), 'myapp_professor'
+        yield 'module-instances', get('/api/module-instances/?limit=20'), 'myapp_moduleinstance'
+        yield 'module-instances (stream)', get_full('/api/module-instances/?stream=1'), 'myapp_moduleinstance'
+        yield 'module-instance lookup', get(f'/api/module-instances/{instance.module.code}/{instance.year}/{instance.semester}/'), None
+        yield 'catalogue version', get('/api/catalogue/version/'), None
+        yield 'ratings', get('/api/ratings/?limit=20'), None
+        yield 'average', get(f'/api/average/{rated.professor_id}/{rated.module_instance.module_id}/'), None
+        yield 'average (not taught)', get(f'/api/average/{professor_id}/{untaught.module_id}/'), None
+        yield 'averages', get('/api/averages/?top=3'), 'myapp_professorinstanceaggregate'
+        yield 'averages (module)', get(f'/api/averages/?module={instance.module.code}&group=professor'), None
+        yield 'rate', post('/api/rate/', {'professor_id': professor_id, 'module_instance_id': instance.id, 'rating': 4}), None
+        yield 'rate batch', post('/api/rate/batch/', [{'professor_id': professor_id, 'module_instance_id': instance.id, 'rating': 3}]), None
+        yield 'logout', lambda: client.post('/api/logout/', **headers), None
+
+    def check_views(self, verbose):
+        client = Client()
+        token = client.post(
+            '/api/login/', json.dumps({'username': 'user1', 'password': 'password'}), content_type='application/json'
+        ).json()['token']
+        headers = {'HTTP_AUTHORIZATION': f'Token {token}'}
+
+        failures = 0
+        for label, thunk, allowed in self.requests(client, headers):
+            with CaptureQueriesContext(connection) as captured:
+                thunk()
+            for query in captured.captured_queries:
+                sql = query['sql']
+                if SKIPPED.match(sql):
+                    continue
+                plan = explain(sql)
+                scans = full_scans(plan, allowed)
+                failures += bool(scans)
+                if scans or verbose:
+                    status = self.style.ERROR('FULL SCAN') if scans else 'ok'
+                    self.stdout.write(f"[{label}] {status}: {sql}")
+                    for step in plan:
+                        self.stdout.write(f"    {step}")
+        return failures
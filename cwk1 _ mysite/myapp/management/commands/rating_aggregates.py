@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from myapp import aggregates
+
+
+class Command(BaseCommand):
+    help = "Check the materialized rating aggregates against Rating, or rebuild them from scratch."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help="Recompute the aggregate tables from Rating.")
+        parser.add_argument('--check', action='store_true', help="Report rows that have drifted from Rating (default).")
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            written = aggregates.rebuild()
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt rating aggregates ({written} rows)."))
+            if not options['check']:
+                return
+
+        drift = aggregates.find_drift()
+        for table, key, stored, expected in drift:
+            self.stdout.write(f"{table} {key}: stored={stored} expected={expected}")
+        if drift:
+            raise CommandError(f"{len(drift)} aggregate rows have drifted; run with --rebuild to fix.")
+        self.stdout.write(self.style.SUCCESS("Rating aggregates match Rating."))
@@ -0,0 +1,64 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from myapp import analytics
+
+
+class Command(BaseCommand):
+    help = "Rating statistics (count, mean, std, percentiles, stars) grouped by year, semester, module, professor or instance."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--by', default='', help="Comma-separated dimensions to group by, e.g. year,module.")
+        parser.add_argument('--filter', action='append', default=[], metavar='DIMENSION=VALUE',
+                            help="Only count matching ratings, e.g. --filter year=2023 (repeatable).")
+        parser.add_argument('--percentiles', default='25,50,75', help="Comma-separated percentiles to report.")
+        parser.add_argument('--json', action='store_true', help="Print the results as JSON instead of a table.")
+
+    def handle(self, *args, **options):
+        if not analytics.available():
+            raise CommandError("Ratings analytics need NumPy; install it with 'pip install numpy'.")
+
+        by = [name for name in options['by'].split(',') if name]
+        filters = dict(item.partition('=')[::2] for item in options['filter'])
+        unknown = (set(by) | set(filters)) - set(analytics.DIMENSIONS)
+        if unknown:
+            raise CommandError(f"Unknown dimensions {', '.join(sorted(unknown))}; use {', '.join(analytics.DIMENSIONS)}.")
+        try:
+            filters.update({name: int(filters[name]) for name in ('year', 'semester', 'instance') if name in filters})
+            percentiles = [float(p) for p in options['percentiles'].split(',') if p]
+        except ValueError:
+            raise CommandError("year, semester, instance and --percentiles must be numbers.")
+
+        columns = analytics.get_columns()
+        started = time.perf_counter()
+        refresh = columns.refresh()
+        loaded = time.perf_counter() - started
+        started = time.perf_counter()
+        results = analytics.professor_names(columns.group_stats(by, filters, percentiles))
+        queried = time.perf_counter() - started
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+        else:
+            self.write_table(results)
+        self.stderr.write(
+            f"{refresh['rows']} ratings ({columns.nbytes() / 1e6:.1f} MB) loaded in {loaded:.2f}s; "
+            f"{len(results)} groups in {queried * 1000:.1f}ms."
+        )
+
+    def write_table(self, results):
+        if not results:
+            self.stdout.write("No matching ratings.")
+            return
+        columns = [name for name in results[0] if name != 'stars'] + ['stars']
+        rows = [
+            [' '.join(f'{star}:{count}' for star, count in value.items()) if name == 'stars' else str(value)
+             for name, value in ((name, result[name]) for name in columns)]
+            for result in results
+        ]
+        widths = [max(len(name), *(len(row[i]) for row in rows)) for i, name in enumerate(columns)]
+        self.stdout.write('  '.join(name.ljust(width) for name, width in zip(columns, widths)))
+        for row in rows:
+            self.stdout.write('  '.join(cell.ljust(width) for cell, width in zip(row, widths)))
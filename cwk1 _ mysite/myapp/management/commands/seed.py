@@ -0,0 +1,70 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from myapp.models import Module, ModuleInstance, Professor, Rating
+from myapp.seeding import generate
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a large, reproducible synthetic dataset (professors, modules, module instances, "
+        "users and ratings) in an empty database, for sizing and load testing."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--professors', type=int, default=20000)
+        parser.add_argument('--modules', type=int, default=2000)
+        parser.add_argument('--instances', type=int, default=40000)
+        parser.add_argument('--users', type=int, default=20000)
+        parser.add_argument('--ratings-per-user', type=int, default=100)
+        parser.add_argument('--seed', type=int, default=0, help="Random seed for the generated data.")
+        parser.add_argument('--password', default='password', help="Password given to every generated user.")
+        parser.add_argument('--chunk-size', type=int, default=5000, help="Rows per bulk insert and transaction.")
+        parser.add_argument('--hash-workers', type=int, help="Processes used to hash passwords (default: one per CPU).")
+        parser.add_argument('--shared-password', action='store_true', help="Hash the password once and reuse it for every user.")
+        parser.add_argument('--target-rate', type=float, default=20000, help="Expected overall rows/sec; slower runs are flagged.")
+
+    def handle(self, *args, **options):
+        negative = [name for name in ('professors', 'modules', 'instances', 'users', 'ratings_per_user') if options[name] < 0]
+        if negative:
+            raise CommandError(f"--{negative[0].replace('_', '-')} must not be negative.")
+        if options['instances'] and not options['modules']:
+            raise CommandError("--instances needs at least one module to belong to; pass --modules 1 or more, or --instances 0.")
+        if options['chunk_size'] < 1 or (options['hash_workers'] is not None and options['hash_workers'] < 1):
+            raise CommandError("--chunk-size and --hash-workers must be at least 1.")
+        if any(model.objects.exists() for model in (Professor, Module, ModuleInstance, Rating)):
+            raise CommandError("The catalogue is not empty; run seed against an empty database (e.g. after manage.py flush).")
+        if User.objects.filter(username__regex=r'^user[0-9]+$').exists():
+            raise CommandError("Users named user<N> already exist; run seed against an empty database.")
+
+        start = time.perf_counter()
+        phase = {'label': None, 'start': start, 'last': start, 'reported': 0}
+
+        def progress(label, done, total):
+            now = time.perf_counter()
+            if label != phase['label']:
+                # A phase starts where the previous one finished.
+                phase.update(label=label, start=phase['last'], reported=0)
+            phase['last'] = now
+            if done == total or now - phase['reported'] >= 1:
+                phase['reported'] = now
+                rate = done / (now - phase['start'])
+                self.stdout.write(f"  {label}: {done:,}/{total:,} ({rate:,.0f} rows/s)")
+
+        counts = generate(
+            professors=options['professors'], modules=options['modules'], instances=options['instances'],
+            users=options['users'], ratings_per_user=options['ratings_per_user'], seed=options['seed'],
+            password=options['password'], chunk_size=options['chunk_size'], hash_workers=options['hash_workers'],
+            shared_password=options['shared_password'], progress=progress,
+        )
+
+        elapsed = time.perf_counter() - start
+        rows = sum(counts.values())
+        rate = rows / elapsed
+        summary = f"Seeded {rows:,} rows in {elapsed:.1f}s ({rate:,.0f} rows/s, target {options['target_rate']:,.0f})."
+        if rate < options['target_rate']:
+            self.stdout.write(self.style.WARNING(summary + " Below target."))
+        else:
+            self.stdout.write(self.style.SUCCESS(summary))
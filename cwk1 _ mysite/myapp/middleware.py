@@ -0,0 +1,245 @@
+import json
+import logging
+import random
+import time
+import zlib
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+from . import timing
+from .auth_cache import token_cache
+from .renderers import quality_values
+
+try:
+    import brotli
+except ImportError:  # Optional: without it responses are only gzip-compressed.
+    brotli = None
+
+logger = logging.getLogger('myapp.timing')
+
+
+class ServerTimingMiddleware:
+    """
+    Report where a request's time went in a Server-Timing header.
+
+    Phases: auth (token lookup), serialize (JSON encoding in json_response),
+    view (the rest of the request: Python object building) and db (all SQL,
+    with the query count; not counted in the other phases), plus the total.
+    Notes such as whether the token cache hit are added as desc-only metrics.
+    Only a SERVER_TIMING_SAMPLE_RATE fraction of requests is measured; with
+    SERVER_TIMING_LOG the same figures are also logged as one JSON line on the
+    'myapp.timing' logger. Streamed bodies are encoded after the headers are
+    sent, so their encoding time falls outside the report.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'SERVER_TIMING_SAMPLE_RATE', 1.0)
+        self.log = getattr(settings, 'SERVER_TIMING_LOG', False)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def sampled(self):
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+
+        started = time.perf_counter()
+        timings, token = timing.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            timing.stop(token)
+        return self.report(request, response, timings, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+
+        started = time.perf_counter()
+        timings, token = timing.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            timing.stop(token)
+        return self.report(request, response, timings, time.perf_counter() - started)
+
+    def report(self, request, response, timings, total):
+        phases = dict(timings.phases)
+        phases['view'] = max(0.0, total - sum(phases.values()) - timings.sql)
+
+        metrics = [f'{name};dur={seconds * 1000:.2f}' for name, seconds in phases.items()]
+        metrics.append(f'db;dur={timings.sql * 1000:.2f};desc="{timings.queries} queries"')
+        metrics.append(f'total;dur={total * 1000:.2f}')
+        metrics.extend(f'{name.replace("_", "-")};desc="{value}"' for name, value in timings.notes.items())
+        response['Server-Timing'] = ', '.join(metrics)
+
+        if self.log:
+            logger.info(json.dumps({
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'queries': timings.queries,
+                **{f'{name}_ms': round(seconds * 1000, 2) for name, seconds in phases.items()},
+                'db_ms': round(timings.sql * 1000, 2),
+                'total_ms': round(total * 1000, 2),
+                **timings.notes,
+                # Counters of this worker's cache since it started.
+                'token_cache_stats': token_cache.stats(),
+            }))
+        return response
+
+
+# ------------------------------------------------------------------------
+# Response Compression
+# ------------------------------------------------------------------------
+
+class GzipEncoder:
+    name = 'gzip'
+
+    def __init__(self, level):
+        self._zlib = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31: gzip container.
+
+    def process(self, data):
+        return self._zlib.compress(data)
+
+    def flush(self):
+        return self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._zlib.flush()
+
+
+class BrotliEncoder:
+    name = 'br'
+
+    def __init__(self, quality):
+        self._brotli = brotli.Compressor(quality=quality)
+
+    def process(self, data):
+        return self._brotli.process(data)
+
+    def flush(self):
+        return self._brotli.flush()
+
+    def finish(self):
+        return self._brotli.finish()
+
+
+def preferred_coding(request):
+    """Return 'br' (if brotli is installed) or 'gzip', whichever the client prefers in Accept-Encoding, or None."""
+    accepted = quality_values(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    wildcard = accepted.get('*', 0)
+    br, gzip = accepted.get('br', wildcard), accepted.get('gzip', wildcard)
+    if brotli is not None and br and br >= gzip:
+        return 'br'
+    if gzip:
+        return 'gzip'
+    return None
+
+
+def make_encoder(coding):
+    """Return a fresh encoder for `coding` at the configured compression level."""
+    if coding == 'br':
+        return BrotliEncoder(getattr(settings, 'COMPRESSION_BROTLI_QUALITY', 4))
+    return GzipEncoder(getattr(settings, 'COMPRESSION_GZIP_LEVEL', 6))
+
+
+def compress(coding, data):
+    """Compress a whole body with `coding`."""
+    encoder = make_encoder(coding)
+    return encoder.process(data) + encoder.finish()
+
+
+class CompressionMiddleware:
+    """
+    Compress responses with brotli (if installed) or gzip, whichever the
+    client prefers in Accept-Encoding.
+
+    Only COMPRESSION_CONTENT_TYPES are compressed, and plain responses only
+    from COMPRESSION_MIN_SIZE bytes up: below that the saving does not pay for
+    the CPU. Streamed responses are always compressed, chunk by chunk, with a
+    flush after each chunk so the client still receives rows as they are
+    produced. Compressed responses get a weak ETag, since their bytes differ
+    from the identity representation. Responses that already carry a
+    Content-Encoding (pre-compressed catalogue snapshots) pass through.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_size = getattr(settings, 'COMPRESSION_MIN_SIZE', 1024)
+        self.content_types = tuple(getattr(settings, 'COMPRESSION_CONTENT_TYPES', ('application/json', 'text/')))
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process_response(request, await self.get_response(request))
+
+    def encoder(self, request):
+        """Return a fresh encoder for the client's preferred coding, or None for identity."""
+        coding = preferred_coding(request)
+        return make_encoder(coding) if coding else None
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding') or response.status_code == 304:
+            return response
+        if not response.get('Content-Type', '').startswith(self.content_types):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if not response.streaming and len(response.content) < self.min_size:
+            return response
+
+        encoder = self.encoder(request)
+        if encoder is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = self.acompress_stream(encoder, response.streaming_content)
+            else:
+                response.streaming_content = self.compress_stream(encoder, response.streaming_content)
+            del response['Content-Length']
+        else:
+            with timing.phase('compress'):
+                body = encoder.process(response.content) + encoder.finish()
+            if len(body) >= len(response.content):
+                return response
+            response.content = body
+            response['Content-Length'] = str(len(body))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoder.name
+        return response
+
+    @staticmethod
+    def compress_stream(encoder, chunks):
+        for chunk in chunks:
+            data = encoder.process(chunk) + encoder.flush()
+            if data:
+                yield data
+        yield encoder.finish()
+
+    @staticmethod
+    async def acompress_stream(encoder, chunks):
+        async for chunk in chunks:
+            data = encoder.process(chunk) + encoder.flush()
+            if data:
+                yield data
+        yield encoder.finish()
@@ -0,0 +1,71 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def populate_aggregates(apps, schema_editor):
+    Rating = apps.get_model('myapp', 'Rating')
+    ProfessorInstanceAggregate = apps.get_model('myapp', 'ProfessorInstanceAggregate')
+    ProfessorModuleAggregate = apps.get_model('myapp', 'ProfessorModuleAggregate')
+    fields = {
+        'count': Count('id'),
+        'total': Sum('rating'),
+        **{f'stars_{star}': Count('id', filter=Q(rating=star)) for star in range(1, 6)},
+    }
+    ProfessorInstanceAggregate.objects.bulk_create(
+        ProfessorInstanceAggregate(**row)
+        for row in Rating.objects.values('professor_id', 'module_instance_id').annotate(**fields).order_by()
+    )
+    ProfessorModuleAggregate.objects.bulk_create(
+        ProfessorModuleAggregate(module_id=row.pop('module_instance__module_id'), **row)
+        for row in Rating.objects.values('professor_id', 'module_instance__module_id').annotate(**fields).order_by()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0003_alter_module_code_alter_moduleinstance_module_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfessorInstanceAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('stars_1', models.PositiveIntegerField(default=0)),
+                ('stars_2', models.PositiveIntegerField(default=0)),
+                ('stars_3', models.PositiveIntegerField(default=0)),
+                ('stars_4', models.PositiveIntegerField(default=0)),
+                ('stars_5', models.PositiveIntegerField(default=0)),
+                ('module_instance', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='myapp.moduleinstance')),
+                ('professor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='myapp.professor')),
+            ],
+            options={
+                'unique_together': {('professor', 'module_instance')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ProfessorModuleAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('stars_1', models.PositiveIntegerField(default=0)),
+                ('stars_2', models.PositiveIntegerField(default=0)),
+                ('stars_3', models.PositiveIntegerField(default=0)),
+                ('stars_4', models.PositiveIntegerField(default=0)),
+                ('stars_5', models.PositiveIntegerField(default=0)),
+                ('module', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='myapp.module')),
+                ('professor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='myapp.professor')),
+            ],
+            options={
+                'unique_together': {('professor', 'module')},
+            },
+        ),
+        migrations.RunPython(populate_aggregates, migrations.RunPython.noop),
+    ]
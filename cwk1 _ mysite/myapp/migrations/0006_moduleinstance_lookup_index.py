@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0005_catalogue_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='moduleinstance',
+            index=models.Index(fields=['module', 'year', 'semester'], name='moduleinstance_lookup_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:49
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0006_moduleinstance_lookup_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='rating',
+            index=models.Index(fields=['professor', 'module_instance', 'rating'], name='rating_prof_instance_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rating',
+            index=models.Index(fields=['user', 'module_instance'], name='rating_user_instance_idx'),
+        ),
+    ]
@@ -21,10 +21,20 @@ class ModuleInstance(models.Model):
     year = models.IntegerField()
     semester = models.IntegerField()
     professors = models.ManyToManyField(Professor, related_name='module_instances')
+
+    class Meta:
+        indexes = [models.Index(fields=['module', 'year', 'semester'], name='moduleinstance_lookup_idx')]
     
     def __str__(self):
         return f"{self.module.module_name} ({self.year} - Semester {self.semester})"
 
+class CatalogueVersion(models.Model):
+    """Single-row counter bumped whenever professors, modules or module instances change."""
+    version = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"Catalogue version {self.version}"
+
 class Rating(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     professor = models.ForeignKey(Professor, on_delete=models.CASCADE)
@@ -33,6 +43,49 @@ class Rating(models.Model):
 
     class Meta:
         unique_together = ('user', 'professor', 'module_instance')
+        indexes = [
+            # Covers per-professor aggregation over instances without touching the table.
+            models.Index(fields=['professor', 'module_instance', 'rating'], name='rating_prof_instance_idx'),
+            models.Index(fields=['user', 'module_instance'], name='rating_user_instance_idx'),
+        ]
 
     def __str__(self):
-        return f"{self.user.username} rated {self.professor.name} ({self.rating} stars) for {self.module_instance.module.code}"
\ No newline at end of file
+        return f"{self.user.username} rated {self.professor.name} ({self.rating} stars) for {self.module_instance.module.code}"
+
+class RatingsVersion(models.Model):
+    """Single-row counter bumped whenever a stored rating is changed or deleted (new ratings leave it alone)."""
+    version = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"Ratings version {self.version}"
+
+
+class RatingAggregate(models.Model):
+    """Materialized count/sum/per-star totals of Rating, kept in step by myapp.aggregates."""
+    professor = models.ForeignKey(Professor, on_delete=models.CASCADE)
+    count = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    stars_1 = models.PositiveIntegerField(default=0)
+    stars_2 = models.PositiveIntegerField(default=0)
+    stars_3 = models.PositiveIntegerField(default=0)
+    stars_4 = models.PositiveIntegerField(default=0)
+    stars_5 = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+    @property
+    def average(self):
+        return self.total / self.count if self.count else None
+
+class ProfessorModuleAggregate(RatingAggregate):
+    module = models.ForeignKey(Module, on_delete=models.CASCADE)
+
+    class Meta:
+        unique_together = ('professor', 'module')
+
+class ProfessorInstanceAggregate(RatingAggregate):
+    module_instance = models.ForeignKey(ModuleInstance, on_delete=models.CASCADE)
+
+    class Meta:
+        unique_together = ('professor', 'module_instance')
@@ -0,0 +1,82 @@
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.db import models
+
+
+class InvalidPage(ValueError):
+    """Raised when the cursor or limit query parameters cannot be used."""
+
+
+def encode_cursor(value):
+    """Encode the last key of a page as an opaque, URL-safe cursor."""
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor."""
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidPage('Invalid cursor.')
+
+
+def page_params(request):
+    """Return (after, limit) from the ?cursor= and ?limit= query parameters."""
+    default_size = getattr(settings, 'PAGE_SIZE_DEFAULT', 100)
+    max_size = getattr(settings, 'PAGE_SIZE_MAX', 500)
+    try:
+        limit = int(request.GET.get('limit', default_size))
+    except ValueError:
+        raise InvalidPage('Limit must be an integer.')
+    if limit < 1:
+        raise InvalidPage('Limit must be positive.')
+
+    cursor = request.GET.get('cursor')
+    return (decode_cursor(cursor) if cursor else None), min(limit, max_size)
+
+
+def _check_cursor_type(queryset, key, after):
+    """Reject a cursor whose value does not fit `key` (e.g. a string for an integer id)."""
+    field = queryset.model._meta.get_field(key)
+    if isinstance(field, models.IntegerField):
+        valid = isinstance(after, int) and not isinstance(after, bool)
+    else:
+        valid = isinstance(after, str)
+    if not valid:
+        raise InvalidPage('Invalid cursor.')
+
+
+def _page_queryset(queryset, request, key):
+    after, limit = page_params(request)
+    if after is not None:
+        _check_cursor_type(queryset, key, after)
+        queryset = queryset.filter(**{f'{key}__gt': after})
+    return queryset.order_by(key)[:limit + 1], limit
+
+
+def _split_page(rows, limit, key):
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1][key])
+    return rows, None
+
+
+def keyset_page(queryset, request, key='id'):
+    """
+    Return (rows, next_cursor) for one page of `queryset`, ordered by `key`.
+
+    Pages are selected with `key > last seen key` rather than OFFSET, so deep
+    pages cost the same as the first. `queryset` should be a values() queryset
+    that includes `key`.
+    """
+    page, limit = _page_queryset(queryset, request, key)
+    return _split_page(list(page), limit, key)
+
+
+async def akeyset_page(queryset, request, key='id'):
+    """Async variant of keyset_page."""
+    page, limit = _page_queryset(queryset, request, key)
+    return _split_page([row async for row in page], limit, key)
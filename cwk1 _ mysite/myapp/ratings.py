@@ -0,0 +1,69 @@
+from functools import cache
+
+from django.db import connection, transaction
+from django.db.models import OuterRef, Subquery
+
+from .aggregates import apply_ratings
+from .models import ModuleInstance, Rating
+
+UPSERT_ATTEMPTS = 3
+
+
+class RatingConflict(Exception):
+    """Raised when concurrent writes keep changing the rating being upserted."""
+
+
+@cache
+def _upsert_sql():
+    """
+    INSERT the rating only if the professor teaches the instance, or replace the
+    stored value if it is still the one read beforehand (a compare-and-set).
+    Returns the rating id, or no row when either condition fails.
+    """
+    qn = connection.ops.quote_name
+    rating, through = Rating._meta, ModuleInstance.professors.through._meta
+    table = qn(rating.db_table)
+    user, professor, instance, value = (qn(rating.get_field(name).column) for name in ('user', 'professor', 'module_instance', 'rating'))
+    taught_professor = qn(through.get_field('professor').column)
+    taught_instance = qn(through.get_field('moduleinstance').column)
+    return (
+        f'INSERT INTO {table} ({user}, {professor}, {instance}, {value}) '
+        f'SELECT %s, {taught_professor}, {taught_instance}, %s FROM {qn(through.db_table)} '
+        f'WHERE {taught_professor} = %s AND {taught_instance} = %s '
+        f'ON CONFLICT ({user}, {professor}, {instance}) DO UPDATE SET {value} = excluded.{value} '
+        f'WHERE {table}.{value} = %s '
+        f'RETURNING {qn(rating.pk.column)}'
+    )
+
+
+def upsert_rating(user_id, professor_id, module_instance_id, value):
+    """
+    Create or replace a user's rating of a professor in a module instance.
+
+    Returns (created, previous value), or None if the professor does not teach
+    the instance. One query reads the teaching link and any existing rating,
+    one upserts; the rating aggregates are then adjusted by the difference.
+    If another request changes the same rating in between, the upsert matches
+    nothing and is retried with a fresh read.
+    """
+    existing = Rating.objects.filter(user_id=user_id, professor_id=OuterRef('professor_id'), module_instance_id=OuterRef('moduleinstance_id'))
+    target = ModuleInstance.professors.through.objects.filter(
+        professor_id=professor_id, moduleinstance_id=module_instance_id
+    ).annotate(previous=Subquery(existing.values('rating')[:1])).values_list('moduleinstance__module_id', 'previous')
+
+    for _ in range(UPSERT_ATTEMPTS):
+        with transaction.atomic():
+            row = target.first()
+            if row is None:
+                return None
+            module_id, previous = row
+            with connection.cursor() as cursor:
+                cursor.execute(_upsert_sql(), [user_id, value, professor_id, module_instance_id, previous])
+                if cursor.fetchone() is None:
+                    continue
+            if previous != value:
+                if previous is not None:
+                    apply_ratings([(professor_id, module_instance_id, module_id, previous)], delta=-1)
+                apply_ratings([(professor_id, module_instance_id, module_id, value)])
+            return previous is None, previous
+    raise RatingConflict(f'Rating of {professor_id} in instance {module_instance_id} kept changing.')
@@ -0,0 +1,108 @@
+import json
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+try:
+    import orjson
+except ImportError:  # Optional: the stdlib encoder is used without it.
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # Optional: MessagePack is only offered when installed.
+    msgpack = None
+
+JSON = 'application/json'
+MSGPACK = 'application/msgpack'
+MSGPACK_ALIASES = (MSGPACK, 'application/x-msgpack')
+
+
+def quality_values(header):
+    """Parse an Accept or Accept-Encoding header into {value: q}, dropping values with q=0."""
+    accepted = {}
+    for item in header.split(','):
+        value, *params = item.strip().lower().split(';')
+        q = 1.0
+        for param in params:
+            name, _, number = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    q = float(number)
+                except ValueError:
+                    q = 0.0
+        if value and q > 0:
+            accepted[value] = q
+    return accepted
+
+
+# ------------------------------------------------------------------------
+# Encoders
+# ------------------------------------------------------------------------
+
+def _default(obj):
+    """Encode what the fast encoders cannot (Decimal, lazy strings, ...) as DjangoJSONEncoder would."""
+    return DjangoJSONEncoder().default(obj)
+
+
+@lru_cache(maxsize=None)
+def json_backend():
+    """Return the JSON encoder in use: settings.JSON_BACKEND, or 'orjson' when installed under 'auto'."""
+    backend = getattr(settings, 'JSON_BACKEND', 'auto')
+    if backend == 'auto':
+        return 'orjson' if orjson is not None else 'stdlib'
+    return backend
+
+
+def dumps_json(obj):
+    """Encode `obj` as JSON bytes with the configured backend."""
+    if json_backend() == 'orjson':
+        return orjson.dumps(obj, default=_default)
+    return json.dumps(obj, cls=DjangoJSONEncoder).encode()
+
+
+def dumps_msgpack(obj):
+    return msgpack.packb(obj, default=_default, use_bin_type=True)
+
+
+# ------------------------------------------------------------------------
+# Negotiation
+# ------------------------------------------------------------------------
+
+def negotiate(request):
+    """Return the media type to answer `request` with: MessagePack if preferred and available, else JSON."""
+    if msgpack is None:
+        return JSON
+    accepted = quality_values(request.META.get('HTTP_ACCEPT', ''))
+    packed = max(accepted.get(alias, 0) for alias in MSGPACK_ALIASES)
+    return MSGPACK if packed and packed >= accepted.get(JSON, 0) else JSON
+
+
+def columnar(rows):
+    """Turn a list of dicts sharing their keys into one list per key: {'id': [...], 'name': [...]}."""
+    if not rows:
+        return {}
+    return {key: [row[key] for row in rows] for key in rows[0]}
+
+
+def render(message, status=200, request=None):
+    """
+    Encode `message` into a response.
+
+    Without a request the body is always JSON. With one, the media type is
+    negotiated from Accept, and a list response ({'results': [...]}) is sent
+    as one array per column when the request asks for ?shape=columns.
+    """
+    if request is None:
+        return HttpResponse(dumps_json(message), status=status, content_type=JSON)
+
+    if request.GET.get('shape') == 'columns' and isinstance(message.get('results'), list):
+        message = {**message, 'results': columnar(message['results'])}
+    media_type = negotiate(request)
+    body = dumps_msgpack(message) if media_type == MSGPACK else dumps_json(message)
+    response = HttpResponse(body, status=status, content_type=media_type)
+    patch_vary_headers(response, ('Accept',))
+    return response
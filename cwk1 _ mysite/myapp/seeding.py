@@ -0,0 +1,194 @@
+import random
+from concurrent.futures import ProcessPoolExecutor
+from itertools import accumulate, islice, repeat
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+
+from . import aggregates
+from .catalogue import bump_version
+from .models import Module, ModuleInstance, Professor, Rating
+
+
+# ------------------------------------------------------------------------
+# Helpers
+# ------------------------------------------------------------------------
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _next_id(model):
+    return (model.objects.aggregate(last=Max('id'))['last'] or 0) + 1
+
+
+def _init_hash_worker():
+    import django
+    django.setup()
+
+
+def _hash_password(password):
+    return make_password(password)
+
+
+def _sample_pairs(rng, cum_weights, k):
+    """Pick k distinct pair indices, favouring popular pairs."""
+    n = len(cum_weights)
+    if 2 * k >= n:
+        return sorted(rng.sample(range(n), min(k, n)))
+    chosen = set()
+    while len(chosen) < k:
+        chosen.update(rng.choices(range(n), cum_weights=cum_weights, k=k - len(chosen)))
+    return sorted(chosen)
+
+
+class _Writer:
+    """Writes rows in chunks, one transaction per chunk, reporting progress as it goes."""
+
+    def __init__(self, chunk_size, progress):
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.counts = {}
+
+    def _report(self, label, done, total):
+        self.counts[label] = done
+        if self.progress:
+            self.progress(label, done, total)
+
+    def bulk_create(self, label, model, objects, total):
+        done = 0
+        for chunk in _chunks(objects, self.chunk_size):
+            with transaction.atomic():
+                model.objects.bulk_create(chunk, batch_size=self.chunk_size)
+            done += len(chunk)
+            self._report(label, done, total)
+
+    def insert_rows(self, label, model, fields, rows, total):
+        """Insert tuples of `fields` values straight into `model`'s table, skipping model instances."""
+        qn = connection.ops.quote_name
+        columns = [qn(model._meta.get_field(field).column) for field in fields]
+        sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+            qn(model._meta.db_table), ', '.join(columns), ', '.join(['%s'] * len(columns)),
+        )
+        done = 0
+        for chunk in _chunks(rows, self.chunk_size):
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(sql, chunk)
+            done += len(chunk)
+            self._report(label, done, total)
+
+
+# ------------------------------------------------------------------------
+# Generators
+# ------------------------------------------------------------------------
+
+def generate(professors, modules, instances, users, ratings_per_user, seed=0, password='password',
+             chunk_size=5000, hash_workers=None, shared_password=False, progress=None):
+    """
+    Fill an empty catalogue with a random but reproducible dataset; return {table: rows written}.
+
+    Professors get a hidden "quality" that their ratings scatter around, and
+    a Zipf-like popularity, so a few professors collect most of the ratings.
+    Each module instance is taught by 1-3 professors. Users are named user0,
+    user1, ... and each rates `ratings_per_user` distinct (professor, module
+    instance) pairs. The catalogue and users go through chunked bulk_create;
+    the M2M teaching links and ratings are inserted as raw rows. Passwords are hashed with a fresh salt per user in a
+    process pool of `hash_workers`, or once for everyone with `shared_password`.
+
+    `progress(label, done, total)` is called after every chunk. Signal
+    receivers do not run for bulk inserts, so the rating aggregates are
+    rebuilt and the catalogue version bumped at the end.
+    """
+    rng = random.Random(seed)
+    writer = _Writer(chunk_size, progress)
+
+    pool = None
+    if shared_password or users == 0:
+        hashes = repeat(make_password(password), users)
+    else:
+        # Hashing is the slowest step; let it run in other processes while the catalogue is written.
+        pool = ProcessPoolExecutor(max_workers=hash_workers, initializer=_init_hash_worker)
+        hashes = pool.map(_hash_password, repeat(password, users), chunksize=max(1, min(64, users // 32)))
+
+    try:
+        professor_ids = [f'P{i}' for i in range(professors)]
+        quality = {professor_id: min(5.0, max(1.0, rng.gauss(3.5, 0.8))) for professor_id in professor_ids}
+        popularity = {professor_id: 1 / (rank + 1) ** 0.8 for rank, professor_id in enumerate(rng.sample(professor_ids, professors))}
+        writer.bulk_create(
+            'professors', Professor, (Professor(id=professor_id, name=f'Professor {i}') for i, professor_id in enumerate(professor_ids)),
+            professors,
+        )
+        writer.bulk_create(
+            'modules', Module, (Module(code=f'M{i}', module_name=f'Module {i}') for i in range(modules)), modules,
+        )
+
+        first_instance = _next_id(ModuleInstance)
+        instance_ids = range(first_instance, first_instance + instances)
+        writer.bulk_create(
+            'module instances', ModuleInstance,
+            (
+                ModuleInstance(id=instance_id, module_id=f'M{rng.randrange(modules)}', year=rng.randint(2015, 2025), semester=rng.randint(1, 2))
+                for instance_id in instance_ids
+            ),
+            instances,
+        )
+        taught = [
+            (professor_id, instance_id)
+            for instance_id in instance_ids
+            for professor_id in sorted(rng.sample(professor_ids, min(professors, rng.randint(1, 3))))
+        ]
+        writer.insert_rows(
+            'teaching links', ModuleInstance.professors.through, ('moduleinstance', 'professor'),
+            ((instance_id, professor_id) for professor_id, instance_id in taught), len(taught),
+        )
+
+        first_user = _next_id(User)
+        user_ids = range(first_user, first_user + users)
+        writer.bulk_create(
+            'users', User,
+            (User(id=user_id, username=f'user{i}', password=hashed) for i, (user_id, hashed) in enumerate(zip(user_ids, hashes))),
+            users,
+        )
+    finally:
+        if pool:
+            pool.shutdown()
+
+    # Explicit ids leave sequence-backed databases (PostgreSQL) behind; move them past the new rows.
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), [ModuleInstance, User]):
+            cursor.execute(sql)
+
+    cum_weights = list(accumulate(popularity[professor_id] for professor_id, _ in taught))
+    per_user = min(ratings_per_user, len(taught))
+
+    def ratings():
+        for user_id in user_ids:
+            for index in _sample_pairs(rng, cum_weights, per_user):
+                professor_id, instance_id = taught[index]
+                value = min(5, max(1, round(rng.gauss(quality[professor_id], 1.0))))
+                yield user_id, professor_id, instance_id, value
+
+    # Ratings dwarf every other table, so they skip model instances too.
+    writer.insert_rows('ratings', Rating, ('user', 'professor', 'module_instance', 'rating'), ratings(), users * per_user)
+
+    aggregates.rebuild()
+    bump_version()
+    return writer.counts
+
+
+def seed_sample(professors=200, modules=50, instances=400, users=50, ratings_per_user=40, seed=0, password='password'):
+    """
+    Fill an empty database with a small random catalogue, users and ratings.
+
+    Users are named user0, user1, ... and share `password`. Intended for
+    throwaway databases (query plan checks, benchmarks).
+    """
+    return generate(
+        professors=professors, modules=modules, instances=instances, users=users,
+        ratings_per_user=ratings_per_user, seed=seed, password=password, shared_password=True,
+    )
@@ -0,0 +1,113 @@
+from django.contrib.auth.models import User
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from . import signed_tokens
+from .aggregates import apply_ratings, rating_row
+from .auth_cache import token_cache
+from .catalogue import bump_version
+from .db import configure_sqlite
+from .models import Module, ModuleInstance, Professor, Rating
+from .snapshots import catalogue_snapshots
+from .timing import install_query_timer
+
+
+# ------------------------------------------------------------------------
+# Token Cache Invalidation
+# ------------------------------------------------------------------------
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    """Evict a token from the auth cache, in every worker, when it is deleted (logout, login, admin)."""
+    token_cache.invalidate(instance.key)
+    token_cache.invalidate_user(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+def invalidate_saved_user(sender, instance, created, **kwargs):
+    """Evict a user's tokens when the user changes (e.g. deactivated in the admin)."""
+    if not created:
+        token_cache.invalidate_user(instance.pk)
+        # Signed tokens carry no is_active flag, so revoke them outright.
+        signed_tokens.revoke_user(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def revoke_deleted_user(sender, instance, **kwargs):
+    """Revoke a deleted user's signed tokens, which would otherwise outlive the account."""
+    token_cache.invalidate_user(instance.pk)
+    signed_tokens.revoke_user(instance.pk)
+
+
+# ------------------------------------------------------------------------
+# Rating Aggregate Maintenance
+# ------------------------------------------------------------------------
+
+@receiver(pre_save, sender=Rating)
+def remember_previous_rating(sender, instance, raw=False, **kwargs):
+    """Remember the stored version of a rating that is about to be changed, as its aggregate key tuple."""
+    instance._previous_row = None
+    if instance.pk and not raw:
+        instance._previous_row = Rating.objects.filter(pk=instance.pk).values_list(
+            'professor_id', 'module_instance_id', 'module_instance__module_id', 'rating'
+        ).first()
+
+
+@receiver(post_save, sender=Rating)
+def update_aggregates_on_save(sender, instance, created, raw=False, **kwargs):
+    """Keep the rating aggregates in step with created and edited ratings."""
+    if raw:
+        return
+    previous = getattr(instance, '_previous_row', None)
+    module_id = None
+    if previous:
+        apply_ratings([previous], delta=-1)
+        if previous[1] == instance.module_instance_id:
+            module_id = previous[2]
+    apply_ratings([rating_row(instance, module_id)])
+
+
+@receiver(post_delete, sender=Rating)
+def update_aggregates_on_delete(sender, instance, **kwargs):
+    """Remove deleted ratings from the aggregates."""
+    apply_ratings([rating_row(instance)], delta=-1)
+
+
+# ------------------------------------------------------------------------
+# Catalogue Version
+# ------------------------------------------------------------------------
+
+@receiver(post_save, sender=Professor)
+@receiver(post_save, sender=Module)
+@receiver(post_save, sender=ModuleInstance)
+@receiver(post_delete, sender=Professor)
+@receiver(post_delete, sender=Module)
+@receiver(post_delete, sender=ModuleInstance)
+def bump_catalogue_on_change(sender, **kwargs):
+    """Invalidate catalogue ETags and snapshots when a professor, module or module instance changes."""
+    bump_version()
+    catalogue_snapshots.invalidate()
+
+
+@receiver(m2m_changed, sender=ModuleInstance.professors.through)
+def bump_catalogue_on_professors_change(sender, action, **kwargs):
+    """Invalidate catalogue ETags and snapshots when the professors teaching an instance change."""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_version()
+        catalogue_snapshots.invalidate()
+
+
+# ------------------------------------------------------------------------
+# Request Timing
+# ------------------------------------------------------------------------
+
+connection_created.connect(install_query_timer, dispatch_uid='myapp.install_query_timer')
+
+
+# ------------------------------------------------------------------------
+# Database Connection Setup
+# ------------------------------------------------------------------------
+
+connection_created.connect(configure_sqlite, dispatch_uid='myapp.configure_sqlite')
@@ -0,0 +1,73 @@
+import time
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import caches
+
+SALT = 'myapp.signed_tokens'
+
+
+def _max_age():
+    return getattr(settings, 'SIGNED_TOKEN_MAX_AGE', 24 * 60 * 60)
+
+
+def _revocations():
+    return caches[getattr(settings, 'SIGNED_TOKEN_REVOCATION_CACHE', 'default')]
+
+
+def _revocation_key(user_id):
+    return f'signed-token-not-before:{user_id}'
+
+
+def enabled():
+    """Signed tokens are only issued and accepted in AUTH_TOKEN_MODE 'signed'."""
+    return getattr(settings, 'AUTH_TOKEN_MODE', 'db') == 'signed'
+
+
+def is_signed(token_key):
+    """Tell signed tokens apart from authtoken keys, which are plain hex."""
+    return ':' in token_key
+
+
+def issue(user):
+    """Return an HMAC-signed, expiring token carrying the user's id and username."""
+    return signing.dumps({'uid': user.id, 'name': user.username, 'iat': time.time()}, salt=SALT)
+
+
+def _claims(token_key):
+    try:
+        claims = signing.loads(token_key, salt=SALT, max_age=_max_age())
+    except signing.BadSignature:  # Includes SignatureExpired.
+        return None
+    return claims if isinstance(claims, dict) and {'uid', 'name', 'iat'} <= claims.keys() else None
+
+
+def _user(claims, not_before):
+    if claims is None or (not_before is not None and claims['iat'] < not_before):
+        return None
+    return claims['uid'], claims['name'], True
+
+
+def verify(token_key):
+    """
+    Return (user id, username, is_active) for a valid, unexpired and unrevoked
+    signed token, or None. Needs no database query: the signature proves the
+    claims, and revocations are one cache read.
+    """
+    claims = _claims(token_key)
+    return _user(claims, claims and _revocations().get(_revocation_key(claims['uid'])))
+
+
+async def averify(token_key):
+    """Async variant of verify."""
+    claims = _claims(token_key)
+    return _user(claims, claims and await _revocations().aget(_revocation_key(claims['uid'])))
+
+
+def revoke_user(user_id):
+    """
+    Revoke every signed token issued to a user so far (logout, login elsewhere,
+    account changes). The entry outlives the longest-lived token, then expires,
+    so the revocation list only holds recently revoked users.
+    """
+    _revocations().set(_revocation_key(user_id), time.time(), timeout=_max_age())
@@ -0,0 +1,90 @@
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+
+
+class CatalogueSnapshots:
+    """
+    Pre-encoded full-catalogue responses, one per resource and representation.
+
+    Every entry is tagged with the catalogue version it was built from, and
+    the catalogue signals bump that version whenever a professor, module or
+    module instance (or who teaches it) changes, so a snapshot is rebuilt on
+    the first request after a change and never served stale. Compressed
+    variants (gzip, br) are kept next to each snapshot, so a snapshot is also
+    compressed once per version rather than once per request. Each worker keeps
+    the snapshots it has served in memory; with `cache_alias` they are also
+    shared through that Django cache, so one worker builds each version and the
+    others fetch the bytes.
+    """
+
+    def __init__(self, cache_alias=None, cache_timeout=3600):
+        self.cache_alias = cache_alias
+        self.cache_timeout = cache_timeout
+        self.builds = 0
+        self._entries = {}  # key -> (version, media type, body)
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+
+    def _fresh(self, key, version):
+        entry = self._entries.get(key)
+        return entry[1:] if entry is not None and entry[0] == version else None
+
+    def _load(self, key, version, build):
+        snapshot = self._fresh(key, version)
+        if snapshot is not None:
+            return snapshot
+
+        # One build at a time, so a burst of requests after a change runs the queries once.
+        with self._build_lock:
+            snapshot = self._fresh(key, version)
+            if snapshot is not None:
+                return snapshot
+            cache_key = f'catalogue-snapshot:{key}:{version}'
+            if self.cache_alias:
+                snapshot = caches[self.cache_alias].get(cache_key)
+            if snapshot is None:
+                snapshot = build()
+                self.builds += 1
+                if self.cache_alias:
+                    caches[self.cache_alias].set(cache_key, snapshot, timeout=self.cache_timeout)
+            with self._lock:
+                self._entries[key] = (version, *snapshot)
+        return tuple(snapshot)
+
+    def get(self, key, version, build, coding=None, encode=None):
+        """
+        Return (media type, body) for `key` at `version`, calling build() for
+        them on a miss. With a content `coding`, the body comes encoded by
+        encode(body), which runs once per snapshot and coding.
+        """
+        snapshot = self._load(key, version, build)
+        if coding is None:
+            return snapshot
+        media_type, body = snapshot
+        return self._load(f'{key}:{coding}', version, lambda: (media_type, encode(body)))
+
+    async def aget(self, key, version, build, coding=None, encode=None):
+        """Async variant of get; a miss is built (and encoded) on the sync thread."""
+        snapshot = self._fresh(key if coding is None else f'{key}:{coding}', version)
+        if snapshot is not None:
+            return snapshot
+        return await sync_to_async(self.get)(key, version, build, coding, encode)
+
+    def invalidate(self):
+        """Drop this worker's snapshots (they would be rebuilt anyway once the version moves on)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'builds': self.builds, 'snapshots': len(self._entries),
+                    'bytes': sum(len(body) for _, _, body in self._entries.values())}
+
+
+catalogue_snapshots = CatalogueSnapshots(
+    cache_alias=getattr(settings, 'CATALOGUE_SNAPSHOT_CACHE', None),
+    cache_timeout=getattr(settings, 'CATALOGUE_SNAPSHOT_TIMEOUT', 3600),
+)
@@ -0,0 +1,322 @@
+import gzip
+import json
+from unittest import mock, skipUnless
+
+from django.contrib.auth.models import User
+from django.db import IntegrityError, connection
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+
+from . import analytics
+from .aggregates import compute_instance_aggregates
+from .auth_cache import TokenCache, token_cache
+from .management.commands.check_query_plans import SKIPPED, Command as CheckQueryPlans, explain, full_scans
+from .models import Module, ModuleInstance, Professor, Rating
+from .seeding import seed_sample
+from .snapshots import catalogue_snapshots
+from .throttling import get_store
+
+
+def reset_caches():
+    """Clear the process-wide caches, which outlive each test's database rollback."""
+    token_cache.clear()
+    get_store().clear()
+    catalogue_snapshots.invalidate()
+
+
+class ApiTestCase(TestCase):
+    """A professor teaching one module instance, and a logged-in user."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.professor = Professor.objects.create(id='P1', name='Professor One')
+        cls.module = Module.objects.create(code='M1', module_name='Module One')
+        cls.instance = ModuleInstance.objects.create(module=cls.module, year=2024, semester=1)
+        cls.instance.professors.add(cls.professor)
+        cls.user = User.objects.create_user('alice', password='password')
+        cls.token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        reset_caches()
+        self.client = Client(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def rate(self, value):
+        data = {'professor_id': self.professor.id, 'module_instance_id': self.instance.id, 'rating': value}
+        return self.client.post('/api/rate/', json.dumps(data), content_type='application/json')
+
+
+# ------------------------------------------------------------------------
+# Query Plans
+# ------------------------------------------------------------------------
+
+@skipUnless(connection.vendor == 'sqlite', "Query plans are checked with SQLite's EXPLAIN QUERY PLAN.")
+class QueryPlanTests(TestCase):
+    """The indexes the API relies on are the ones SQLite picks on a seeded catalogue."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_sample()
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def test_module_instance_lookup_uses_lookup_index(self):
+        instance = ModuleInstance.objects.order_by('id').last()
+        lookup = ModuleInstance.objects.filter(module_id=instance.module_id, year=instance.year, semester=instance.semester)
+        self.assertIn('moduleinstance_lookup_idx', lookup.values('id').explain())
+
+    def test_professor_ratings_use_covering_index(self):
+        rating = Rating.objects.order_by('id').first()
+        ratings = Rating.objects.filter(professor_id=rating.professor_id, module_instance_id=rating.module_instance_id)
+        plan = ratings.values_list('rating', flat=True).explain()
+        self.assertIn('COVERING INDEX rating_prof_instance_idx', plan)
+
+    def test_aggregate_rebuild_reads_covering_index(self):
+        with CaptureQueriesContext(connection) as captured:
+            compute_instance_aggregates()
+        self.assertIn('COVERING INDEX rating_prof_instance_idx', '\n'.join(explain(captured[0]['sql'])))
+
+
+@skipUnless(connection.vendor == 'sqlite', "Query plans are checked with SQLite's EXPLAIN QUERY PLAN.")
+@override_settings(THROTTLE_ENABLED=False)
+class ApiQueryPlanTests(TransactionTestCase):
+    """
+    Every query behind every API view avoids full table scans, apart from
+    the one table a request reads on purpose (see check_query_plans).
+    Transactional, as login checks passwords on the hashing threads.
+    """
+
+    def setUp(self):
+        reset_caches()
+        seed_sample()
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def test_no_unexpected_full_scans(self):
+        client = Client()
+        token = client.post(
+            '/api/login/', json.dumps({'username': 'user1', 'password': 'password'}), content_type='application/json'
+        ).json()['token']
+        for label, thunk, allowed in CheckQueryPlans().requests(client, {'HTTP_AUTHORIZATION': f'Token {token}'}):
+            with CaptureQueriesContext(connection) as captured:
+                thunk()
+            for query in captured.captured_queries:
+                if SKIPPED.match(query['sql']):
+                    continue
+                with self.subTest(label, sql=query['sql']):
+                    self.assertEqual(full_scans(explain(query['sql']), allowed), [])
+
+
+# ------------------------------------------------------------------------
+# API Root
+# ------------------------------------------------------------------------
+
+@override_settings(THROTTLE_ENABLED=False)
+class ApiRootTests(SimpleTestCase):
+
+    def test_lists_absolute_endpoint_urls(self):
+        response = Client().get('/api/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['professors'], 'http://testserver/api/professors/')
+
+
+# ------------------------------------------------------------------------
+# Token Cache
+# ------------------------------------------------------------------------
+
+class TokenCacheTests(SimpleTestCase):
+    """Two TokenCaches sharing the default cache stand for two worker processes."""
+
+    def setUp(self):
+        cache.clear()
+        self.workers = [TokenCache(ttl=30, generation_alias='default') for _ in range(2)]
+        for worker in self.workers:
+            worker.set('alice-token', 1, 'alice', True)
+            worker.set('bob-token', 2, 'bob', True)
+
+    def test_invalidation_reaches_other_workers(self):
+        self.workers[0].invalidate_user(1)
+        self.assertIsNone(self.workers[1].get('alice-token'))
+        self.assertEqual(self.workers[1].get('bob-token'), (2, 'bob', True))
+
+    def test_entries_cached_after_invalidation_hit(self):
+        self.workers[0].invalidate_user(1)
+        self.workers[1].set('alice-token', 1, 'alice', True)
+        self.assertEqual(self.workers[1].get('alice-token'), (1, 'alice', True))
+
+
+# ------------------------------------------------------------------------
+# Rating
+# ------------------------------------------------------------------------
+
+@override_settings(THROTTLE_ENABLED=False)
+class RateTests(ApiTestCase):
+
+    def test_first_rating_is_created(self):
+        response = self.rate(4)
+        self.assertEqual(response.status_code, 201)
+        self.assertIs(response.json()['created'], True)
+
+    def test_second_rating_replaces_the_first(self):
+        self.rate(4)
+        response = self.rate(2)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'message': 'Rating updated successfully.', 'created': False, 'previous_rating': 4})
+        self.assertEqual(Rating.objects.get(user=self.user).rating, 2)
+        average = self.client.get(f'/api/average/{self.professor.id}/{self.module.code}/')
+        self.assertEqual(average.json(), {'average_rating': 2.0})
+
+    def test_average_ignores_instances_no_longer_taught(self):
+        self.rate(4)
+        other = ModuleInstance.objects.create(module=self.module, year=2025, semester=1)
+        other.professors.add(self.professor)
+        Rating.objects.create(user=self.user, professor=self.professor, module_instance=other, rating=2)
+        self.instance.professors.remove(self.professor)
+        average = self.client.get(f'/api/average/{self.professor.id}/{self.module.code}/')
+        self.assertEqual(average.json(), {'average_rating': 2.0})
+        averages = self.client.get('/api/averages/').json()['results']
+        self.assertEqual([(r['professor_id'], r['average_rating']) for r in averages], [('P1', 2.0)])
+
+    def test_editing_a_rating_reads_its_module_once(self):
+        rating = Rating.objects.create(user=self.user, professor=self.professor, module_instance=self.instance, rating=4)
+        rating = Rating.objects.get(pk=rating.pk)
+        rating.rating = 1
+        with CaptureQueriesContext(connection) as captured:
+            rating.save()
+        self.assertEqual(sum('myapp_moduleinstance' in query['sql'] for query in captured.captured_queries), 1)
+
+    def test_untaught_instance_is_rejected(self):
+        Professor.objects.create(id='P2', name='Professor Two')
+        data = {'professor_id': 'P2', 'module_instance_id': self.instance.id, 'rating': 3}
+        response = self.client.post('/api/rate/', json.dumps(data), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Rating.objects.exists())
+
+
+@override_settings(THROTTLE_ENABLED=False)
+class RateBatchTests(ApiTestCase):
+
+    def rate_batch(self, *values):
+        items = [{'professor_id': self.professor.id, 'module_instance_id': self.instance.id, 'rating': value} for value in values]
+        return self.client.post('/api/rate/batch/', json.dumps(items), content_type='application/json')
+
+    def test_existing_and_repeated_ratings_are_replaced(self):
+        self.rate(4)
+        response = self.rate_batch(2, 5)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], [
+            {'status': 'updated', 'previous_rating': 4},
+            {'status': 'updated', 'previous_rating': 2},
+        ])
+        self.assertEqual(Rating.objects.get(user=self.user).rating, 5)
+
+    def test_concurrent_insert_falls_back_to_upserts(self):
+        with mock.patch.object(Rating.objects, 'bulk_create', side_effect=IntegrityError) as bulk_create:
+            response = self.rate_batch(3, 1)
+        bulk_create.assert_called_once()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], [{'status': 'created'}, {'status': 'updated', 'previous_rating': 3}])
+        average = self.client.get(f'/api/average/{self.professor.id}/{self.module.code}/')
+        self.assertEqual(average.json(), {'average_rating': 1.0})
+
+
+# ------------------------------------------------------------------------
+# Analytics
+# ------------------------------------------------------------------------
+
+@skipUnless(analytics.available(), 'Ratings analytics need NumPy.')
+@override_settings(THROTTLE_ENABLED=False)
+class RatingColumnsTests(ApiTestCase):
+
+    def test_rerating_reloads_even_when_count_and_sum_match(self):
+        bob = User.objects.create_user('bob', password='password')
+        self.rate(4)
+        Rating.objects.create(user=bob, professor=self.professor, module_instance=self.instance, rating=2)
+        columns = analytics.RatingColumns()
+        self.assertEqual(columns.refresh()['mode'], 'full')
+        # Swapping the two ratings leaves their count and sum unchanged.
+        self.rate(2)
+        bob_rating = Rating.objects.get(user=bob)
+        bob_rating.rating = 4
+        bob_rating.save()
+        self.assertEqual(columns.refresh()['mode'], 'full')
+        self.assertEqual(sorted(columns.columns['rating'].tolist()), [2, 4])
+        self.assertEqual(columns.refresh()['mode'], 'incremental')
+
+
+# ------------------------------------------------------------------------
+# Conditional Requests
+# ------------------------------------------------------------------------
+
+@override_settings(THROTTLE_ENABLED=False)
+class CatalogueETagTests(ApiTestCase):
+
+    def test_matching_etag_gets_304(self):
+        response = self.client.get('/api/professors/')
+        self.assertEqual(response.status_code, 200)
+        not_modified = self.client.get('/api/professors/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], response['ETag'])
+
+    def test_catalogue_change_invalidates_etag(self):
+        etag = self.client.get('/api/professors/')['ETag']
+        Professor.objects.create(id='P2', name='Professor Two')
+        response = self.client.get('/api/professors/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.json()['results']), 2)
+
+
+@override_settings(THROTTLE_ENABLED=False, CATALOGUE_SNAPSHOTS=True)
+class CatalogueSnapshotTests(ApiTestCase):
+
+    def test_snapshot_is_compressed_once_per_version(self):
+        url = '/api/module-instances/?stream=1'
+        plain = self.client.get(url)
+        self.assertNotIn('Content-Encoding', plain)
+        builds = catalogue_snapshots.builds
+        for _ in range(3):
+            response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertEqual(catalogue_snapshots.builds, builds + 1)
+        self.assertEqual(response['ETag'], 'W/' + plain['ETag'])
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+
+# ------------------------------------------------------------------------
+# Throttling
+# ------------------------------------------------------------------------
+
+@override_settings(THROTTLE_ENABLED=True, THROTTLE_RATES={'default': '2/m'}, THROTTLE_IP_RATES={'default': '100/m'})
+class ThrottleTests(ApiTestCase):
+
+    def test_user_over_limit_gets_429_with_retry_after(self):
+        for _ in range(2):
+            self.assertEqual(self.client.get('/api/professors/').status_code, 200)
+        response = self.client.get('/api/professors/')
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+
+    def test_invalid_tokens_only_use_the_ip_bucket(self):
+        with override_settings(THROTTLE_IP_RATES={'default': '3/m'}):
+            statuses = [Client(HTTP_AUTHORIZATION=f'Token bad{n}').get('/api/professors/').status_code for n in range(4)]
+        self.assertEqual(statuses, [401, 401, 401, 429])
+
+
+# ------------------------------------------------------------------------
+# Seeding
+# ------------------------------------------------------------------------
+
+class SeedCommandTests(TestCase):
+
+    def test_instances_without_modules_are_rejected(self):
+        with self.assertRaisesMessage(CommandError, '--instances needs at least one module'):
+            call_command('seed', modules=0, instances=5)
+        self.assertFalse(Professor.objects.exists())
+
+    def test_negative_counts_are_rejected(self):
+        with self.assertRaisesMessage(CommandError, '--ratings-per-user must not be negative.'):
+            call_command('seed', ratings_per_user=-1)
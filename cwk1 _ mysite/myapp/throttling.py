@@ -0,0 +1,169 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache, wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+
+from .renderers import render
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+@lru_cache(maxsize=None)
+def parse_rate(rate):
+    """Parse 'N/s', 'N/m', 'N/h' or 'N/d' into (seconds per request, burst of N)."""
+    count, _, period = rate.partition('/')
+    count = int(count)
+    return PERIODS[period[0]] / count, count
+
+
+# ------------------------------------------------------------------------
+# Bucket Stores
+# ------------------------------------------------------------------------
+
+# Both stores implement a token bucket as GCRA: each key holds one number, the
+# time at which its bucket will be full again ("theoretical arrival time").
+# A request is allowed if taking one token would not push that time more than
+# a burst's worth into the future.
+
+def _advance(tat, now, interval, burst):
+    """Return (new tat, 0) if allowed, or (tat, seconds to wait) if not."""
+    new_tat = max(tat, now) + interval
+    wait = new_tat - now - burst * interval
+    if wait > 0:
+        return tat, wait
+    return new_tat, 0.0
+
+
+class MemoryBucketStore:
+    """Buckets in this process's memory, bounded to the `max_keys` most recently seen keys."""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._tats = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, interval, burst):
+        """Take one token from `key`'s bucket; return 0 if allowed, else seconds until it would be."""
+        now = time.monotonic()
+        with self._lock:
+            tat, wait = _advance(self._tats.get(key, now), now, interval, burst)
+            self._tats[key] = tat
+            self._tats.move_to_end(key)
+            if len(self._tats) > self.max_keys:
+                self._tats.popitem(last=False)
+        return wait
+
+    def clear(self):
+        with self._lock:
+            self._tats.clear()
+
+
+class CacheBucketStore:
+    """
+    Buckets in a Django cache shared by several workers (e.g. a file-based
+    cache on one host, or Memcached/Redis). The read and write are not atomic,
+    so workers racing on the same key may let a few extra requests through.
+    """
+
+    def __init__(self, alias):
+        self.alias = alias
+
+    def take(self, key, interval, burst):
+        cache, now = caches[self.alias], time.time()
+        cache_key = f'throttle:{key}'
+        tat, wait = _advance(cache.get(cache_key, now), now, interval, burst)
+        if not wait:
+            cache.set(cache_key, tat, timeout=math.ceil(tat - now) + 1)
+        return wait
+
+    def clear(self):
+        caches[self.alias].clear()
+
+
+def _make_store():
+    if getattr(settings, 'THROTTLE_STORE', 'memory') == 'cache':
+        return CacheBucketStore(getattr(settings, 'THROTTLE_CACHE', 'default'))
+    return MemoryBucketStore(getattr(settings, 'THROTTLE_MAX_KEYS', 100000))
+
+
+_store = None
+
+
+def get_store():
+    """Return the process-wide bucket store, created from settings on first use."""
+    global _store
+    if _store is None:
+        _store = _make_store()
+    return _store
+
+
+# ------------------------------------------------------------------------
+# Decorator
+# ------------------------------------------------------------------------
+
+def _take(request, rates_setting, scope, key):
+    """
+    Take a token from `key`'s bucket at the scope's rate; return None, or a
+    429 response with Retry-After, in the format `request` negotiated.
+    """
+    if not getattr(settings, 'THROTTLE_ENABLED', True):
+        return None
+    rates = getattr(settings, rates_setting, {})
+    rate = rates.get(scope, rates.get('default'))
+    if not rate:
+        return None
+    interval, burst = parse_rate(rate)
+    wait = get_store().take(f'{scope}:{key}', interval, burst)
+    if not wait:
+        return None
+    response = render({'error': 'Too many requests. Please slow down.'}, status=429, request=request)
+    response['Retry-After'] = str(math.ceil(wait))
+    return response
+
+
+def check(request, scope):
+    """Apply the per-IP limit for `scope` (THROTTLE_IP_RATES); return None or a 429 response."""
+    return _take(request, 'THROTTLE_IP_RATES', scope, 'ip:' + request.META.get('REMOTE_ADDR', ''))
+
+
+def check_user(request):
+    """
+    Apply the per-user limit (THROTTLE_RATES) of the throttled view handling
+    `request`, once authentication has set request.user; return None or a
+    429 response. Unvalidated tokens never get a bucket of their own.
+    """
+    scope = getattr(request, 'throttle_scope', None)
+    if scope is None:
+        return None
+    return _take(request, 'THROTTLE_RATES', scope, f'user:{request.user.id}')
+
+
+def throttle(scope):
+    """
+    Limit a view (sync or async) per client IP address, and per user once its
+    token is validated (see check_user).
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def wrapper(request, *args, **kwargs):
+                limited = check(request, scope)
+                if limited is not None:
+                    return limited
+                request.throttle_scope = scope
+                return await view(request, *args, **kwargs)
+        else:
+            @wraps(view)
+            def wrapper(request, *args, **kwargs):
+                limited = check(request, scope)
+                if limited is not None:
+                    return limited
+                request.throttle_scope = scope
+                return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,92 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+
+
+# Timings of the request being handled, or None when it is not sampled. A
+# ContextVar follows the request into sync_to_async threads, so the ORM calls
+# made by async views are attributed to the right request.
+_current = ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    """Phase durations (excluding SQL), query count, SQL time and notes collected for one request."""
+
+    def __init__(self):
+        self.phases = {}
+        self.queries = 0
+        self.sql = 0.0
+        self.notes = {}
+
+    def add(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+
+def start():
+    """Begin collecting timings for the current request; returns a token for stop()."""
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def stop(token):
+    _current.reset(token)
+
+
+def note(name, value):
+    """Record `value` under `name` for the current request, e.g. whether its token was cached."""
+    timings = _current.get()
+    if timings is not None:
+        timings.notes[name] = value
+
+
+@contextmanager
+def phase(name):
+    """Time the enclosed block as phase `name` of the current request; its SQL counts as db time instead."""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    started, sql = time.perf_counter(), timings.sql
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - started - (timings.sql - sql))
+
+
+def timed(name):
+    """Decorator form of phase() for sync and async functions."""
+    def decorator(func):
+        if iscoroutinefunction(func):
+            @wraps(func)
+            async def wrapper(*args, **kwargs):
+                with phase(name):
+                    return await func(*args, **kwargs)
+        else:
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with phase(name):
+                    return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def query_timer(execute, sql, params, many, context):
+    """Database execute wrapper counting queries and SQL time for sampled requests."""
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.queries += 1
+        timings.sql += time.perf_counter() - started
+
+
+def install_query_timer(sender, connection, **kwargs):
+    """connection_created receiver: time every query run on the new connection."""
+    if query_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_timer)
@@ -16,7 +16,7 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path
-from . import views
+from . import async_views, views
 
 urlpatterns = [
     path('', views.api_root, name='api_root'),  # Root API endpoint
@@ -25,7 +25,18 @@ urlpatterns = [
     path('logout/', views.logout, name='logout'),
     path('professors/', views.professor_list, name='professor_list'),
     path('module-instances/', views.module_instance_list, name='module_instance_list'),
+    path('module-instances/<str:module_code>/<int:year>/<int:semester>/', views.module_instance_lookup, name='module_instance_lookup'),
     path('ratings/', views.rating_list, name='rating_list'),
+    path('catalogue/version/', views.catalogue_version, name='catalogue_version'),
     path('average/<str:professor_id>/<str:module_code>/', views.average_rating, name='average_rating'),
+    path('averages/', views.averages, name='averages'),
     path('rate/', views.rate_professor, name='rate_professor'),
+    path('rate/batch/', views.rate_professor_batch, name='rate_professor_batch'),
+    path('analytics/ratings/', views.ratings_analytics, name='ratings_analytics'),
+
+    # Async variants of the read endpoints, for ASGI deployments (cwk1/asgi.py)
+    path('async/professors/', async_views.professor_list, name='async_professor_list'),
+    path('async/module-instances/', async_views.module_instance_list, name='async_module_instance_list'),
+    path('async/ratings/', async_views.rating_list, name='async_rating_list'),
+    path('async/average/<str:professor_id>/<str:module_code>/', async_views.average_rating, name='async_average_rating'),
 ]
\ No newline at end of file
@@ -1,31 +1,85 @@
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.contrib.auth.models import User
 from django.urls import reverse
-from django.db.models import Avg
 from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import make_password
 from django.views.decorators.csrf import csrf_exempt
 from rest_framework.authtoken.models import Token
 from django.shortcuts import get_object_or_404
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils.cache import patch_vary_headers
+from collections import defaultdict
+from functools import partial
+from itertools import islice
 import json
-from .models import Professor, Module, ModuleInstance, Rating
+from .aggregates import apply_ratings
+from . import analytics, hashing, middleware, renderers, signed_tokens
+from .auth_cache import token_cache
+from .catalogue import catalogue_etag, current_version
+from .hashing import HashingBusy
+from .pagination import InvalidPage, keyset_page
+from .ratings import RatingConflict, upsert_rating
+from .snapshots import catalogue_snapshots
+from .throttling import check_user, throttle
+from .timing import phase, timed
+from .models import Professor, Module, ModuleInstance, Rating, ProfessorInstanceAggregate
+
+
+INSTANCE_FIELDS = ('id', 'module__code', 'module__module_name', 'year', 'semester')
+
+RATING_FIELDS = ('id', 'professor__id', 'professor__name', 'module_instance__module__module_name', 'rating')
 
 
 # ------------------------------------------------------------------------
 # Utility Functions
 # ------------------------------------------------------------------------
 
+def auth_token_key(request):
+    """Return the token from a 'Token <key>' or 'Bearer <key>' Authorization header, or None."""
+    auth_header = request.META.get('HTTP_AUTHORIZATION', '')
+    if auth_header.startswith(('Token ', 'Bearer ')):
+        return auth_header.split(' ')[1]
+    return None
+
+
+def authorize_cached_user(request, cached):
+    """
+    Set request.user from a cached (id, username, is_active) tuple; return
+    True, a 401 response, or a 429 once the user is over their throttle limit.
+    """
+    user_id, username, is_active = cached
+    if not is_active:
+        return JsonResponse({'error': 'User account is disabled.'}, status=401)
+    request.user = User(id=user_id, username=username, is_active=is_active)
+    limited = check_user(request)
+    return True if limited is None else limited
+
+
+@timed('auth')
 def token_required(request):
     """Check if a valid token is provided."""
-    auth_header = request.META.get('HTTP_AUTHORIZATION', '')
-    if auth_header.startswith('Token '):
-        token_key = auth_header.split(' ')[1]
+    token_key = auth_token_key(request)
+    if token_key is None:
+        return JsonResponse({'error': 'Authentication token required. Please log in.'}, status=401)
+
+    # Database tokens are always accepted; signed ones only in AUTH_TOKEN_MODE 'signed'.
+    if signed_tokens.is_signed(token_key):
+        cached = signed_tokens.verify(token_key) if signed_tokens.enabled() else None
+        if cached is None:
+            return JsonResponse({'error': 'Invalid token or token expired. Please log in again.'}, status=401)
+        return authorize_cached_user(request, cached)
+
+    cached = token_cache.get(token_key)
+    if cached is None:
         try:
-            token = Token.objects.get(key=token_key)
-            request.user = token.user
-            return True
+            token = Token.objects.select_related('user').get(key=token_key)
         except Token.DoesNotExist:
             return JsonResponse({'error': 'Invalid token or token expired. Please log in again.'}, status=401)
-    return JsonResponse({'error': 'Authentication token required. Please log in.'}, status=401)
+        cached = (token.user.id, token.user.username, token.user.is_active)
+        token_cache.set(token_key, *cached)
+    return authorize_cached_user(request, cached)
 
 
 def parse_json_request(request):
@@ -36,9 +90,20 @@ def parse_json_request(request):
         return None
 
 
-def json_response(message, status=200):
-    """Return a standardized JSON response."""
-    return JsonResponse(message, status=status, content_type='application/json')
+def json_response(message, status=200, request=None):
+    """
+    Return a standardized JSON response. Given the request, the format is
+    negotiated instead (MessagePack, ?shape=columns; see renderers.render).
+    """
+    with phase('serialize'):
+        return renderers.render(message, status=status, request=request)
+
+
+def busy_response():
+    """Return a 503 telling the client to retry once the password hashing executor has room."""
+    response = json_response({'error': 'The server is busy. Please try again shortly.'}, status=503)
+    response['Retry-After'] = str(getattr(settings, 'HASHING_RETRY_AFTER', 1))
+    return response
 
 
 # ------------------------------------------------------------------------
@@ -46,6 +111,7 @@ def json_response(message, status=200):
 # ------------------------------------------------------------------------
 
 @csrf_exempt
+@throttle('register')
 def register(request):
     """Register a new user."""
     if request.method != 'POST':
@@ -62,11 +128,16 @@ def register(request):
     if User.objects.filter(username=username).exists():
         return json_response({'error': 'Username already exists.'}, status=400)
 
-    User.objects.create_user(username=username, email=email, password=password)
+    try:
+        hashed = hashing.run(make_password, password)
+    except HashingBusy:
+        return busy_response()
+    User.objects.create(username=User.normalize_username(username), email=User.objects.normalize_email(email), password=hashed)
     return json_response({'message': 'User registered successfully!'}, status=200)
 
 
 @csrf_exempt
+@throttle('login')
 def login(request):
     """Log in a user and return a token."""
     if request.method != 'POST':
@@ -80,11 +151,19 @@ def login(request):
     if not username or not password:
         return json_response({'error': 'Username and password are required.'}, status=400)
 
-    user = authenticate(username=username, password=password)
+    try:
+        user = hashing.run(authenticate, username=username, password=password)
+    except HashingBusy:
+        return busy_response()
     if user:
         Token.objects.filter(user=user).delete()  # Remove old tokens
-        token = Token.objects.create(user=user)
-        return json_response({'message': 'Login successful!', 'token': token.key}, status=200)
+        token_cache.invalidate_user(user.id)
+        signed_tokens.revoke_user(user.id)
+        if signed_tokens.enabled():
+            token_key = signed_tokens.issue(user)
+        else:
+            token_key = Token.objects.create(user=user).key
+        return json_response({'message': 'Login successful!', 'token': token_key}, status=200)
     return json_response({'error': 'Username or Password is incorrect!'}, status=401)
 
 
@@ -99,6 +178,8 @@ def logout(request):
         return token_check
 
     Token.objects.filter(user=request.user).delete()
+    token_cache.invalidate_user(request.user.id)
+    signed_tokens.revoke_user(request.user.id)
     return json_response({'message': 'Logout successful!'}, status=200)
 
 
@@ -106,59 +187,252 @@ def logout(request):
 # Data Retrieval Views
 # ------------------------------------------------------------------------
 
+def paginated_response(queryset, request, key='id', transform=None):
+    """Return one keyset page of `queryset` as {'results': [...], 'next': cursor}."""
+    try:
+        rows, next_cursor = keyset_page(queryset, request, key=key)
+    except InvalidPage as e:
+        return json_response({'error': str(e)}, status=400)
+    return json_response({'results': transform(rows) if transform else rows, 'next': next_cursor}, status=200, request=request)
+
+
+def with_etag(response, etag):
+    """
+    Attach a catalogue ETag to a successful response; clients must revalidate
+    before reuse. An already compressed body gets the weak form of the tag.
+    """
+    if response.status_code == 200:
+        response['ETag'] = 'W/' + etag if response.has_header('Content-Encoding') else etag
+        response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def encode_json_batches(batches):
+    """Encode {'results': [...], 'next': null} from an iterable of row batches, yielding bytes a batch at a time."""
+    yield b'{"results": ['
+    separator = b''
+    for rows in batches:
+        if rows:
+            yield separator + b', '.join(renderers.dumps_json(row) for row in rows)
+            separator = b', '
+    yield b'], "next": null}'
+
+
+def streaming_json_response(batches):
+    """Stream {'results': [...], 'next': null} built from an iterable of row batches."""
+    return StreamingHttpResponse(encode_json_batches(batches), content_type='application/json')
+
+
+def chunked(iterable, size):
+    """Yield lists of up to `size` items from `iterable`."""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def professor_links(instances):
+    """Return a values_list queryset of (module instance id, professor id) for a batch of instance rows."""
+    links = ModuleInstance.professors.through.objects.filter(moduleinstance_id__in=[instance['id'] for instance in instances])
+    return links.order_by('moduleinstance_id', 'professor_id').values_list('moduleinstance_id', 'professor_id')
+
+
+def build_instance_rows(instances, links):
+    """Build module instance dicts from instance rows and their (instance id, professor id) links."""
+    professors = defaultdict(list)
+    for instance_id, professor_id in links:
+        professors[instance_id].append(professor_id)
+    return [
+        {
+            'id': instance['id'],
+            'module_code': instance['module__code'],
+            'module_name': instance['module__module_name'],
+            'year': instance['year'],
+            'semester': instance['semester'],
+            'professors': professors[instance['id']]
+        }
+        for instance in instances
+    ]
+
+
+def instance_rows(instances):
+    """Build module instance dicts, fetching the professor IDs for the whole batch in one query."""
+    return build_instance_rows(instances, professor_links(instances))
+
+
+def all_professor_rows():
+    """Return every professor as a list of {'id', 'name'} dicts."""
+    return list(Professor.objects.values('id', 'name').order_by('id'))
+
+
+def professor_batches():
+    """Yield every professor as {'id', 'name'} dicts, STREAM_CHUNK_SIZE rows at a time."""
+    chunk_size = getattr(settings, 'STREAM_CHUNK_SIZE', 2000)
+    return chunked(Professor.objects.values('id', 'name').order_by('id').iterator(chunk_size=chunk_size), chunk_size)
+
+
+def instance_batches():
+    """Yield every module instance as built by instance_rows, one chunk of queries at a time."""
+    chunk_size = getattr(settings, 'STREAM_CHUNK_SIZE', 2000)
+    instances = ModuleInstance.objects.values(*INSTANCE_FIELDS).order_by('id').iterator(chunk_size=chunk_size)
+    return (instance_rows(chunk) for chunk in chunked(instances, chunk_size))
+
+
+def snapshot_key(request, resource):
+    """Key a catalogue snapshot by resource and representation (media type and shape)."""
+    shape = 'columns' if request.GET.get('shape') == 'columns' else 'rows'
+    return f'{resource}:{renderers.negotiate(request)}:{shape}'
+
+
+def snapshot_build(request, batches):
+    """
+    Return a function encoding {'results': rows, 'next': None}, with the rows
+    from batches(), as `request` wants it, as (media type, body). Plain JSON
+    is encoded a batch at a time, so the rows are never all held at once.
+    """
+    def build():
+        if renderers.negotiate(request) == renderers.JSON and request.GET.get('shape') != 'columns':
+            return renderers.JSON, b''.join(encode_json_batches(batches()))
+        rows = [row for batch in batches() for row in batch]
+        response = renderers.render({'results': rows, 'next': None}, request=request)
+        return response['Content-Type'], response.content
+    return build
+
+
+def snapshot_coding(request):
+    """
+    Return the content coding to send a catalogue snapshot in, or None. The
+    snapshot is compressed here, once per version, and CompressionMiddleware
+    lets the encoded response through untouched.
+    """
+    if 'myapp.middleware.CompressionMiddleware' not in settings.MIDDLEWARE:
+        return None
+    content_types = tuple(getattr(settings, 'COMPRESSION_CONTENT_TYPES', ('application/json', 'text/')))
+    if not renderers.negotiate(request).startswith(content_types):
+        return None
+    return middleware.preferred_coding(request)
+
+
+def snapshot_response(version, snapshot, coding=None):
+    """Wrap a catalogue snapshot's (media type, body), encoded with `coding`, in a response labelled with its version."""
+    media_type, body = snapshot
+    response = HttpResponse(body, content_type=media_type)
+    patch_vary_headers(response, ('Accept', 'Accept-Encoding'))
+    if coding:
+        response['Content-Encoding'] = coding
+    response['X-Catalogue-Version'] = str(version)
+    return response
+
+
+def serve_snapshot(request, resource, version, batches):
+    """
+    Serve all of a catalogue resource from its snapshot, building it from
+    batches() if the catalogue changed. Only ?stream=1 is served this way;
+    pages are cheap keyset queries and their cursors too many to keep.
+    """
+    coding = snapshot_coding(request)
+    with phase('serialize'):
+        snapshot = catalogue_snapshots.get(
+            snapshot_key(request, resource), version, snapshot_build(request, batches), coding, partial(middleware.compress, coding),
+        )
+    return snapshot_response(version, snapshot, coding)
+
+
+@throttle('read')
 def professor_list(request):
-    """List all professors."""
+    """List professors, one keyset page at a time, or all of them with ?stream=1."""
     token_check = token_required(request)
     if token_check is not True:
         return token_check
 
+    version = current_version()
+    etag, not_modified = catalogue_etag(request, 'professors', version=version)
+    if not_modified:
+        return not_modified
+
+    if request.GET.get('stream') == '1':
+        if getattr(settings, 'CATALOGUE_SNAPSHOTS', True):
+            return with_etag(serve_snapshot(request, 'professors', version, professor_batches), etag)
+        return with_etag(json_response({'results': all_professor_rows(), 'next': None}, status=200, request=request), etag)
     professors = Professor.objects.values('id', 'name')
-    return json_response(list(professors), status=200)
+    return with_etag(paginated_response(professors, request), etag)
 
 
+@throttle('read')
 def module_instance_list(request):
-    """List all module instances."""
+    """List module instances, one keyset page at a time, or all of them with ?stream=1."""
     token_check = token_required(request)
     if token_check is not True:
         return token_check
 
-    instances = ModuleInstance.objects.select_related('module').prefetch_related('professors').all()
-    instance_list = [
-        {
-            'id': instance.id,
-            'module_code': instance.module.code,
-            'module_name': instance.module.module_name,
-            'year': instance.year,
-            'semester': instance.semester,
-            'professors': [prof.id for prof in instance.professors.all()]
-        }
-        for instance in instances
-    ]
-    return json_response(instance_list, status=200)
+    version = current_version()
+    etag, not_modified = catalogue_etag(request, 'module-instances', version=version)
+    if not_modified:
+        return not_modified
+
+    instances = ModuleInstance.objects.values(*INSTANCE_FIELDS)
+    if request.GET.get('stream') == '1':
+        if getattr(settings, 'CATALOGUE_SNAPSHOTS', True):
+            return with_etag(serve_snapshot(request, 'module-instances', version, instance_batches), etag)
+        # Constant memory: rows are read, decorated and encoded one chunk at a time.
+        return with_etag(streaming_json_response(instance_batches()), etag)
+    return with_etag(paginated_response(instances, request, transform=instance_rows), etag)
+
+
+@throttle('read')
+def module_instance_lookup(request, module_code, year, semester):
+    """Find one module instance by module code, year and semester."""
+    token_check = token_required(request)
+    if token_check is not True:
+        return token_check
+
+    instance = ModuleInstance.objects.filter(module_id=module_code, year=year, semester=semester).values(
+        *INSTANCE_FIELDS
+    ).order_by('id').first()
+    if not instance:
+        return json_response({'error': f"No module instance found for {module_code} in {year} semester {semester}."}, status=404)
+    return json_response(instance_rows([instance])[0], status=200, request=request)
 
 
+@throttle('read')
 def rating_list(request):
-    """List all ratings by the logged-in user."""
+    """List ratings by the logged-in user, one keyset page at a time."""
     token_check = token_required(request)
     if token_check is not True:
         return token_check
 
-    ratings = Rating.objects.filter(user=request.user).select_related('professor', 'module_instance__module').values(
-        'professor__id', 'professor__name', 'module_instance__module__module_name', 'rating'
-    )
-    return json_response(list(ratings), status=200)
+    ratings = Rating.objects.filter(user=request.user).values(*RATING_FIELDS)
+    return paginated_response(ratings, request)
+
+
+@throttle('read')
+def catalogue_version(request):
+    """Return the catalogue version, which changes whenever a professor, module or module instance does."""
+    token_check = token_required(request)
+    if token_check is not True:
+        return token_check
+
+    return json_response({'version': current_version()}, status=200)
 
 
 # ------------------------------------------------------------------------
 # Rating Views
 # ------------------------------------------------------------------------
 
+@throttle('average')
 def average_rating(request, professor_id, module_code):
     """Get average rating for a professor in a module."""
     token_check = token_required(request)
     if token_check is not True:
         return token_check
 
+    # Only instances the professor still teaches count, as ratings outlive changes of teaching staff.
+    aggregate = ProfessorInstanceAggregate.objects.filter(
+        professor_id=professor_id, module_instance__module_id=module_code, module_instance__professors=professor_id
+    ).aggregate(count=Sum('count'), total=Sum('total'))
+    if aggregate['count']:
+        return json_response({'average_rating': round(aggregate['total'] / aggregate['count'], 1)}, status=200, request=request)
+
+    # No ratings recorded: work out which 404 applies.
     professor = get_object_or_404(Professor, id=professor_id)
     module = get_object_or_404(Module, code=module_code)
     module_instances = ModuleInstance.objects.filter(module=module, professors=professor)
@@ -166,16 +440,86 @@ def average_rating(request, professor_id, module_code):
     if not module_instances.exists():
         return json_response({'message': f"Professor {professor.name} does not teach {module.module_name}"}, status=404)
 
-    ratings = Rating.objects.filter(professor=professor, module_instance__in=module_instances)
-    if ratings.exists():
-        avg_rating = round(ratings.aggregate(Avg('rating'))['rating__avg'], 1)
-        return json_response({'average_rating': avg_rating}, status=200)
     return json_response({'message': 'No ratings available.'}, status=404)
 
 
+@throttle('averages')
+def averages(request):
+    """
+    Average ratings for every professor (?group=professor) or every professor/module pair (default).
+
+    Optional filters: ?module=<code>, ?year=, ?semester=. With ?top=<k>, only the k
+    best-rated professors of each module are returned, ranked. Everything comes
+    from one GROUP BY over the per-instance rating aggregates, counting only the
+    instances each professor still teaches, as average_rating does.
+    """
+    token_check = token_required(request)
+    if token_check is not True:
+        return token_check
+
+    group = request.GET.get('group', 'pair')
+    if group not in ('pair', 'professor'):
+        return json_response({'error': "group must be 'pair' or 'professor'."}, status=400)
+    try:
+        year, semester, top = (int(request.GET[name]) if request.GET.get(name) else None for name in ('year', 'semester', 'top'))
+    except ValueError:
+        return json_response({'error': 'year, semester and top must be integers.'}, status=400)
+    if top is not None and (top < 1 or group != 'pair'):
+        return json_response({'error': 'top must be positive and requires group=pair.'}, status=400)
+
+    rows = ProfessorInstanceAggregate.objects.filter(count__gt=0, module_instance__professors=F('professor_id'))
+    if request.GET.get('module'):
+        rows = rows.filter(module_instance__module_id=request.GET['module'])
+    if year is not None:
+        rows = rows.filter(module_instance__year=year)
+    if semester is not None:
+        rows = rows.filter(module_instance__semester=semester)
+
+    keys = ['professor_id', 'professor__name'] + (['module_instance__module_id'] if group == 'pair' else [])
+    rows = rows.values(*keys).annotate(ratings=Sum('count'), rating_total=Sum('total')).order_by(*keys)
+    results = [
+        {
+            'professor_id': row['professor_id'],
+            'professor_name': row['professor__name'],
+            **({'module_code': row['module_instance__module_id']} if group == 'pair' else {}),
+            'average_rating': round(row['rating_total'] / row['ratings'], 1),
+            'ratings': row['ratings'],
+        }
+        for row in rows
+    ]
+
+    if top is not None:
+        by_module = defaultdict(list)
+        for result in results:
+            by_module[result['module_code']].append(result)
+        results = []
+        for module_code in sorted(by_module):
+            ranked = sorted(by_module[module_code], key=lambda r: (-r['average_rating'], -r['ratings'], r['professor_id']))
+            results.extend({**result, 'rank': rank} for rank, result in enumerate(ranked[:top], start=1))
+
+    return json_response({'results': results}, status=200, request=request)
+
+
+def _rating_error(item):
+    """Return an error message for a malformed rating submission, or None if its fields look valid."""
+    if not isinstance(item, dict):
+        return 'Each rating must be an object.'
+    if not (item.get('professor_id') and item.get('module_instance_id') and item.get('rating')):
+        return 'All fields are required.'
+    rating_value = item['rating']
+    if not isinstance(rating_value, int) or isinstance(rating_value, bool) or not 1 <= rating_value <= 5:
+        return 'Rating must be an integer between 1 and 5.'
+    if not isinstance(item['professor_id'], str):
+        return 'Invalid professor or module instance ID.'
+    if not isinstance(item['module_instance_id'], int) or isinstance(item['module_instance_id'], bool):
+        return 'Invalid professor or module instance ID.'
+    return None
+
+
 @csrf_exempt
+@throttle('rate')
 def rate_professor(request):
-    """Submit a rating for a professor."""
+    """Submit or replace a rating for a professor; 201 if it is new, 200 if it replaced an earlier one."""
     token_check = token_required(request)
     if token_check is not True:
         return token_check
@@ -187,20 +531,143 @@ def rate_professor(request):
     if not data:
         return json_response({'error': 'Invalid JSON data'}, status=400)
 
-    professor_id, module_instance_id, rating_value = data.get('professor_id'), data.get('module_instance_id'), data.get('rating')
-    if not (professor_id and module_instance_id and rating_value):
-        return json_response({'error': 'All fields are required.'}, status=400)
+    error = _rating_error(data)
+    if error:
+        return json_response({'error': error}, status=400)
+
+    professor_id, module_instance_id, rating_value = data['professor_id'], data['module_instance_id'], data['rating']
+    try:
+        outcome = upsert_rating(request.user.id, professor_id, module_instance_id, rating_value)
+    except RatingConflict:
+        return json_response({'error': 'This rating was changed concurrently. Please retry.'}, status=409)
 
-    if not Professor.objects.filter(id=professor_id).exists() or not ModuleInstance.objects.filter(id=module_instance_id).exists():
+    if outcome is None:
+        if Professor.objects.filter(id=professor_id).exists() and ModuleInstance.objects.filter(id=module_instance_id).exists():
+            return json_response({'error': f'Professor {professor_id} does not teach this module instance.'}, status=400)
         return json_response({'error': 'Invalid professor or module instance ID.'}, status=400)
 
-    Rating.objects.create(
-        user=request.user,
-        professor_id=professor_id,
-        module_instance_id=module_instance_id,
-        rating=rating_value
-    )
-    return json_response({'message': 'Rating submitted successfully.'}, status=200)
+    created, previous = outcome
+    if created:
+        return json_response({'message': 'Rating submitted successfully.', 'created': True}, status=201)
+    return json_response({'message': 'Rating updated successfully.', 'created': False, 'previous_rating': previous}, status=200)
+
+
+@csrf_exempt
+@throttle('rate_batch')
+def rate_professor_batch(request):
+    """
+    Submit or replace many ratings at once, reporting a status for each one:
+    created, updated (with the previous rating) or invalid.
+
+    New ratings are inserted in bulk; ratings the user already has, or that
+    appear twice in the batch, are replaced one by one in order, as
+    rate_professor would. If the bulk insert collides with ratings submitted
+    concurrently, those rows are upserted one by one instead.
+    """
+    token_check = token_required(request)
+    if token_check is not True:
+        return token_check
+
+    if request.method != 'POST':
+        return json_response({'error': 'Invalid request method.'}, status=405)
+
+    data = parse_json_request(request)
+    items = data.get('ratings') if isinstance(data, dict) else data
+    if not items or not isinstance(items, list):
+        return json_response({'error': 'Expected a non-empty list of ratings.'}, status=400)
+
+    max_size = getattr(settings, 'RATING_BATCH_MAX_SIZE', 1000)
+    if len(items) > max_size:
+        return json_response({'error': f'A batch may contain at most {max_size} ratings.'}, status=400)
+
+    results = [{'status': 'invalid', 'error': _rating_error(item)} for item in items]
+    valid = [(index, item) for index, item in enumerate(items) if results[index]['error'] is None]
+
+    # Validate the whole batch with three set-based queries.
+    instance_modules = dict(ModuleInstance.objects.filter(id__in={item['module_instance_id'] for _, item in valid}).values_list('id', 'module_id'))
+    taught = set(ModuleInstance.professors.through.objects.filter(
+        moduleinstance_id__in=instance_modules, professor_id__in={item['professor_id'] for _, item in valid}
+    ).values_list('professor_id', 'moduleinstance_id'))
+    seen = set(Rating.objects.filter(user=request.user, module_instance_id__in=instance_modules).values_list('professor_id', 'module_instance_id'))
+
+    new_ratings, upserts = [], []
+    for index, item in valid:
+        key = (item['professor_id'], item['module_instance_id'])
+        if key[1] not in instance_modules:
+            results[index] = {'status': 'invalid', 'error': 'Invalid professor or module instance ID.'}
+        elif key not in taught:
+            results[index] = {'status': 'invalid', 'error': f'Professor {key[0]} does not teach this module instance.'}
+        elif key in seen:
+            upserts.append((index, key, item['rating']))
+        else:
+            seen.add(key)
+            results[index] = {'status': 'created'}
+            new_ratings.append((index, Rating(user=request.user, professor_id=key[0], module_instance_id=key[1], rating=item['rating'])))
+
+    try:
+        with transaction.atomic():
+            Rating.objects.bulk_create([rating for _, rating in new_ratings], batch_size=500)
+            apply_ratings((r.professor_id, r.module_instance_id, instance_modules[r.module_instance_id], r.rating) for _, r in new_ratings)
+    except IntegrityError:
+        # Some of them were submitted concurrently: upsert every new rating instead, ahead of the later rows.
+        upserts[:0] = [(index, (r.professor_id, r.module_instance_id), r.rating) for index, r in new_ratings]
+
+    for index, (professor_id, module_instance_id), value in upserts:
+        try:
+            outcome = upsert_rating(request.user.id, professor_id, module_instance_id, value)
+        except RatingConflict:
+            results[index] = {'status': 'invalid', 'error': 'This rating was changed concurrently. Please retry.'}
+            continue
+        if outcome is None:
+            results[index] = {'status': 'invalid', 'error': f'Professor {professor_id} does not teach this module instance.'}
+        elif outcome[0]:
+            results[index] = {'status': 'created'}
+        else:
+            results[index] = {'status': 'updated', 'previous_rating': outcome[1]}
+
+    counts = {status: sum(1 for result in results if result['status'] == status) for status in ('created', 'updated', 'invalid')}
+    return json_response({**counts, 'results': results}, status=200)
+
+
+# ------------------------------------------------------------------------
+# Analytics Views
+# ------------------------------------------------------------------------
+
+@throttle('analytics')
+def ratings_analytics(request):
+    """
+    Rating statistics grouped by any of year, semester, module, professor and instance (staff only).
+
+    ?by=year,module picks the grouping (default: all ratings as one group);
+    ?year=, ?semester=, ?module=, ?professor= and ?instance= filter;
+    ?percentiles=10,50,90 picks the percentiles (default 25,50,75). Answers
+    come from analytics.RatingColumns, refreshed at most every
+    ANALYTICS_MAX_AGE seconds, or now with ?refresh=1.
+    """
+    token_check = token_required(request)
+    if token_check is not True:
+        return token_check
+    if not User.objects.filter(pk=request.user.id, is_staff=True).exists():
+        return json_response({'error': 'Staff access required.'}, status=403)
+    if not analytics.available():
+        return json_response({'error': 'Ratings analytics need NumPy installed on the server.'}, status=501)
+
+    by = [name for name in request.GET.get('by', '').split(',') if name]
+    if not set(by) <= set(analytics.DIMENSIONS) or len(set(by)) != len(by):
+        return json_response({'error': f"by must list distinct dimensions from: {', '.join(analytics.DIMENSIONS)}."}, status=400)
+    filters = {name: request.GET[name] for name in analytics.DIMENSIONS if request.GET.get(name)}
+    try:
+        filters.update({name: int(filters[name]) for name in ('year', 'semester', 'instance') if name in filters})
+        percentiles = [float(p) for p in request.GET.get('percentiles', '25,50,75').split(',') if p]
+    except ValueError:
+        return json_response({'error': 'year, semester, instance and percentiles must be numbers.'}, status=400)
+    if not all(0 <= p <= 100 for p in percentiles):
+        return json_response({'error': 'Percentiles must be between 0 and 100.'}, status=400)
+
+    columns = analytics.get_columns()
+    refresh = columns.refresh(max_age=0 if request.GET.get('refresh') == '1' else getattr(settings, 'ANALYTICS_MAX_AGE', 10))
+    results = analytics.professor_names(columns.group_stats(by, filters, percentiles))
+    return json_response({'results': results, 'ratings': refresh['rows'], 'refresh': refresh['mode']}, status=200, request=request)
 
 
 # ------------------------------------------------------------------------
@@ -210,12 +677,13 @@ def rate_professor(request):
 def api_root(request):
     """Root API view to list all available endpoints."""
     endpoints = {
-        "register": reverse('register', request=request),
-        "login": reverse('login', request=request),
-        "logout": reverse('logout', request=request),
-        "professors": reverse('professor_list', request=request),
-        "module_instances": reverse('module_instance_list', request=request),
-        "ratings": reverse('rating_list', request=request),
-        "rate_professor": reverse('rate_professor', request=request)
+        "register": request.build_absolute_uri(reverse('register')),
+        "login": request.build_absolute_uri(reverse('login')),
+        "logout": request.build_absolute_uri(reverse('logout')),
+        "professors": request.build_absolute_uri(reverse('professor_list')),
+        "module_instances": request.build_absolute_uri(reverse('module_instance_list')),
+        "catalogue_version": request.build_absolute_uri(reverse('catalogue_version')),
+        "ratings": request.build_absolute_uri(reverse('rating_list')),
+        "rate_professor": request.build_absolute_uri(reverse('rate_professor'))
     }
     return json_response(endpoints, status=200)
\ No newline at end of file
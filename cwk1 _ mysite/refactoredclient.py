@@ -1,13 +1,45 @@
+import hashlib
+import json
+import os
 import requests
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 from tabulate import tabulate
 from datetime import datetime
+from pathlib import Path
+from urllib3.util.retry import Retry
+
+try:
+    import msgpack
+except ImportError:  # Optional: compact mode falls back to column-shaped JSON.
+    msgpack = None
 
 current_year = datetime.now().year  # Get the current year
 
 BASE_URL = None  # Change this to your deployed URL if needed
 token = None  # To store authentication token
 
+# Connection pooling and retries, overridable from the environment
+POOL_SIZE = int(os.environ.get('CWK1_POOL_SIZE', 10))  # Keep-alive connections per host
+MAX_RETRIES = int(os.environ.get('CWK1_MAX_RETRIES', 3))  # Retries for idempotent requests
+RETRY_BACKOFF = float(os.environ.get('CWK1_RETRY_BACKOFF', 0.3))  # Seconds, doubled on each retry
+TIMEOUT = (float(os.environ.get('CWK1_CONNECT_TIMEOUT', 3.05)), float(os.environ.get('CWK1_READ_TIMEOUT', 10)))
+MAX_CONCURRENCY = min(int(os.environ.get('CWK1_MAX_CONCURRENCY', 8)), POOL_SIZE)  # Requests in flight at once
+
+_sessions = {}  # One pooled session per base URL
+
+# On-disk catalogue cache (module instances and professors), keyed by base URL
+CACHE_DIR = Path(os.environ.get('CWK1_CACHE_DIR', Path.home() / '.cache' / 'cwk1'))
+CATALOGUE_MAX_AGE = float(os.environ.get('CWK1_CATALOGUE_MAX_AGE', 60))  # Seconds before revalidating with the server
+CATALOGUE_ENDPOINTS = ('module-instances/', 'professors/')
+
+_catalogue = None  # In-memory copy of the cache file for BASE_URL
+
+# Compact responses: lists as one array per column, sent as MessagePack when msgpack is installed
+COMPACT = os.environ.get('CWK1_COMPACT', '0') == '1'
+
 
 # ------------------------------------------------------------------------
 # Utility Functions
@@ -17,16 +49,55 @@ def is_logged_in():
     """Check if a user is already logged in."""
     return token is not None
 
-def make_api_request(endpoint, method='GET', data=None):
-    """Helper function to make API requests."""
+def get_session(base_url):
+    """Return the shared keep-alive session for a base URL, creating it on first use."""
+    session = _sessions.get(base_url)
+    if session is None:
+        # Only GETs are retried: repeating a POST such as rate/ could submit it twice. A 429
+        # (throttled) or 503 is retried after the server's Retry-After instead of the backoff.
+        retry = Retry(total=MAX_RETRIES, backoff_factor=RETRY_BACKOFF, status_forcelist=(429, 502, 503, 504),
+                      allowed_methods=frozenset({'GET', 'HEAD'}), respect_retry_after_header=True,
+                      raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE, max_retries=retry)
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        _sessions[base_url] = session
+    return session
+
+def request_headers():
+    """Return the headers sent with every API request: the auth token, and the compact format if enabled."""
     headers = {'Authorization': f'Token {token}'} if token else {}
+    if COMPACT and msgpack is not None:
+        headers['Accept'] = 'application/msgpack, application/json;q=0.9'
+    return headers
+
+def request_params(params=None):
+    """Add ?shape=columns to a GET's query parameters in compact mode (endpoints other than lists ignore it)."""
+    return {**(params or {}), 'shape': 'columns'} if COMPACT else params
+
+def decode_response(response):
+    """Decode a JSON or MessagePack body, turning column-shaped results back into one dict per row."""
+    if response.headers.get('Content-Type', '').startswith('application/msgpack'):
+        data = msgpack.unpackb(response.content)
+    else:
+        data = response.json()
+    if isinstance(data, dict) and isinstance(data.get('results'), dict):
+        columns = data['results']
+        data['results'] = [dict(zip(columns, values)) for values in zip(*columns.values())]
+    return data
+
+def make_api_request(endpoint, method='GET', data=None, params=None):
+    """Helper function to make API requests."""
+    headers = request_headers()
     url = f'{BASE_URL}/{endpoint}'
+    session = get_session(BASE_URL)
 
     try:
         if method.upper() == 'POST':
-            response = requests.post(url, json=data, headers=headers, timeout=5)
+            response = session.post(url, json=data, headers=headers, timeout=TIMEOUT)
         else:
-            response = requests.get(url, headers=headers, timeout=5)
+            response = session.get(url, params=request_params(params), headers=headers, timeout=TIMEOUT)
 
         if response.content.strip() == b'':
             print("Received an empty response from the server.")
@@ -35,10 +106,107 @@ def make_api_request(endpoint, method='GET', data=None):
             print("Authentication failed. Please login again.")
             return None
 
-        return response.json()
-    except requests.RequestException as e:
+        return decode_response(response)
+    except (requests.RequestException, ValueError) as e:
+        print(f"Request error: {e}")
+        return None
+
+
+def fetch_all(endpoint, page=None):
+    """Fetch every page of a paginated list endpoint by following its 'next' cursor, starting from `page` if given."""
+    results, params = [], None
+    while True:
+        if page is None:
+            page = make_api_request(endpoint, params=params)
+        if page is None or 'results' not in page:
+            return None
+        results.extend(page['results'])
+        if not page.get('next'):
+            return results
+        params, page = {'cursor': page['next']}, None
+
+
+# ------------------------------------------------------------------------
+# Catalogue Cache
+# ------------------------------------------------------------------------
+
+def catalogue_cache_path(base_url):
+    """Return the cache file used for a base URL."""
+    return CACHE_DIR / f"catalogue-{hashlib.sha1(base_url.encode()).hexdigest()[:16]}.json"
+
+def read_catalogue_cache(base_url):
+    """Load the cached catalogue for a base URL, or None if there is no usable cache file."""
+    try:
+        catalogue = json.loads(catalogue_cache_path(base_url).read_text())
+    except (OSError, ValueError):
+        return None
+    return catalogue if catalogue.get('base_url') == base_url else None
+
+def write_catalogue_cache(catalogue):
+    """Atomically save the catalogue cache for its base URL."""
+    path = catalogue_cache_path(catalogue['base_url'])
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps(catalogue))
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Could not save catalogue cache: {e}")
+
+def revalidate(endpoint, cached):
+    """
+    Return {'etag', 'items'} for a catalogue endpoint.
+
+    The first page is requested with If-None-Match; the catalogue ETag
+    changes whenever any of it changes, so a 304 means the cached copy of
+    every page is still current. Returns None if the request failed.
+    """
+    headers = request_headers()
+    if cached and cached.get('etag'):
+        headers['If-None-Match'] = cached['etag']
+    try:
+        response = get_session(BASE_URL).get(f'{BASE_URL}/{endpoint}', params=request_params(), headers=headers, timeout=TIMEOUT)
+        if response.status_code == 304:
+            return cached
+        if response.status_code != 200:
+            return None
+        items = fetch_all(endpoint, page=decode_response(response))
+    except (requests.RequestException, ValueError) as e:
         print(f"Request error: {e}")
         return None
+    return {'etag': response.headers.get('ETag'), 'items': items} if items is not None else None
+
+def load_catalogue(max_age=CATALOGUE_MAX_AGE):
+    """
+    Return the catalogue for BASE_URL as
+    {'instances': [...], 'by_key': {(code, year, semester): instance}, 'professors': {id: name}},
+    answering from the on-disk cache and only revalidating it once it is older than `max_age` seconds.
+    """
+    global _catalogue
+    if _catalogue is None or _catalogue['base_url'] != BASE_URL:
+        _catalogue = read_catalogue_cache(BASE_URL) or {'base_url': BASE_URL, 'checked_at': 0, 'resources': {}}
+
+    if time.time() - _catalogue['checked_at'] > max_age:
+        # The endpoints are independent, so revalidate them concurrently.
+        resources = _catalogue['resources']
+        with ThreadPoolExecutor(max_workers=len(CATALOGUE_ENDPOINTS)) as pool:
+            fresh = list(pool.map(lambda endpoint: revalidate(endpoint, resources.get(endpoint)), CATALOGUE_ENDPOINTS))
+        if None in fresh:
+            return None
+        resources.update(zip(CATALOGUE_ENDPOINTS, fresh))
+        _catalogue['checked_at'] = time.time()
+        write_catalogue_cache(_catalogue)
+
+    instances = _catalogue['resources']['module-instances/']['items']
+    return {
+        'instances': instances,
+        'by_key': {(instance['module_code'], instance['year'], instance['semester']): instance for instance in instances},
+        'professors': {prof['id']: prof['name'] for prof in _catalogue['resources']['professors/']['items']},
+    }
+
+def has_catalogue_cache():
+    """Check whether a catalogue has been cached for BASE_URL."""
+    return (_catalogue is not None and _catalogue['base_url'] == BASE_URL) or catalogue_cache_path(BASE_URL).exists()
 
 
 # ------------------------------------------------------------------------
@@ -129,11 +297,10 @@ def list_modules():
         print("You need to log in to view modules.")
         return
 
-    modules = make_api_request('module-instances/')
-    professors = make_api_request('professors/')
+    catalogue = load_catalogue()
 
-    if modules and professors:
-        professor_dict = {prof['id']: prof['name'] for prof in professors}
+    if catalogue:
+        modules, professor_dict = catalogue['instances'], catalogue['professors']
         table_data = [
             [
                 module['id'],
@@ -156,7 +323,7 @@ def view_ratings():
         print("You need to log in to view ratings.")
         return
 
-    ratings = make_api_request('ratings/')
+    ratings = fetch_all('ratings/')
     if ratings:
         table_data = [
             [
@@ -188,52 +355,100 @@ def rate_professor(command):
 
     professor_id, module_code, year, semester, rating_val = parts[1].upper(), parts[2].upper(), parts[3], parts[4], parts[5]
 
-    module_instances = make_api_request('module-instances/')
-    if not module_instances:
-        print("Failed to retrieve module instances.")
-        return
-
-    matching_instance = next((instance for instance in module_instances if instance['module_code'] == module_code and
-                              instance['year'] == int(year) and instance['semester'] == int(semester)), None)
-
+    # Answer from the local catalogue when one is cached, otherwise ask the server for just this instance.
+    # The server checks that the professor teaches the instance, so no local check is needed.
+    catalogue = load_catalogue() if has_catalogue_cache() else None
+    matching_instance = catalogue and catalogue['by_key'].get((module_code, int(year), int(semester)))
     if not matching_instance:
+        matching_instance = make_api_request(f'module-instances/{module_code}/{int(year)}/{int(semester)}/')
+    if not matching_instance or 'id' not in matching_instance:
         print(f"No module instance found for {module_code} in {year} semester {semester}.")
         return
 
-    if professor_id not in matching_instance['professors']:
-        print(f"Professor {professor_id} did not teach {module_code} in {year} semester {semester}.")
-        return
-
     response = make_api_request('rate/', method='POST', data={
         'professor_id': professor_id,
         'module_instance_id': matching_instance['id'],
         'rating': int(rating_val)
     })
 
-    if response:
-        print("Rating submitted successfully!")
+    if response and 'error' not in response:
+        print(response.get('message', 'Rating submitted successfully!'))
     else:
-        print("Failed to submit rating.")
+        print("Failed to submit rating:", response.get('error', 'Unknown error') if response else 'no response')
+
+
+def fetch_average(professor_id, module_code):
+    """
+    Return (average, None) for one professor in one module, or (None, reason)
+    when there is no average: the server's message (no ratings, not taught),
+    or 'Error: ...' when the request itself failed (e.g. still throttled).
+    """
+    response = make_api_request(f'average/{professor_id}/{module_code}/')
+    if response is None:
+        return None, "Error: no response from the server"
+    if 'average_rating' in response:
+        return response['average_rating'], None
+    if 'error' in response:
+        return None, f"Error: {response['error']}"
+    return None, response.get('message', "No ratings available.")
+
+
+def fetch_all_averages():
+    """
+    Return {(professor_id, module_code): average} for every rated pair from
+    one averages/ request, or None if it failed.
+    """
+    response = make_api_request('averages/')
+    if not response or 'results' not in response:
+        print("Failed to retrieve averages:", response.get('error', 'Unknown error') if response else 'no response')
+        return None
+    return {(row['professor_id'], row['module_code']): row['average_rating'] for row in response['results']}
 
 
 def average_rate(command):
-    """Get the average rating for a professor for a specific module."""
+    """Get the average rating for one or more professor/module pairs, or for every pair with 'average all'."""
     if not is_logged_in():
         print("You need to log in to view ratings.")
         return
 
     parts = command.split()
-    if len(parts) != 3:
-        print("Invalid command format. Use: average <prof_id> <module_code>")
+    if len(parts) == 2 and parts[1] == 'all':
+        # One averages/ request covers every rated pair; the catalogue adds the taught pairs without ratings.
+        catalogue = load_catalogue()
+        if not catalogue:
+            print("Failed to retrieve modules.")
+            return
+        averages = fetch_all_averages()
+        if averages is None:
+            return
+        pairs = sorted({(prof_id, instance['module_code']) for instance in catalogue['instances'] for prof_id in instance['professors']} | averages.keys())
+        table_data = [[*pair, f"{averages[pair]:.1f}" if pair in averages else "No ratings"] for pair in pairs]
+        print(tabulate(table_data, headers=["Professor", "Module", "Average"], tablefmt="grid", disable_numparse=True))
         return
 
-    professor_id, module_code = parts[1].upper(), parts[2].upper()
-    response = make_api_request(f'average/{professor_id}/{module_code}')
-
-    if response and 'average_rating' in response:
-        print(f"Average rating for Professor {professor_id} in module {module_code}: {response['average_rating']:.1f}")
+    if len(parts) >= 3 and len(parts) % 2 == 1:
+        pairs = [(parts[i].upper(), parts[i + 1].upper()) for i in range(1, len(parts), 2)]
     else:
-        print("No ratings available for this professor in this module.")
+        print("Invalid command format. Use: average <prof_id> <module_code> [<prof_id> <module_code> ...] or average all")
+        return
+
+    if len(pairs) == 1:
+        professor_id, module_code = pairs[0]
+        average, reason = fetch_average(professor_id, module_code)
+        if average is not None:
+            print(f"Average rating for Professor {professor_id} in module {module_code}: {average:.1f}")
+        else:
+            print(reason)
+        return
+
+    # Independent requests: fan them out so the command takes about as long as the slowest one.
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENCY) as pool:
+        averages = list(pool.map(lambda pair: fetch_average(*pair), pairs))
+    table_data = [
+        [professor_id, module_code, f"{average:.1f}" if average is not None else reason]
+        for (professor_id, module_code), (average, reason) in zip(pairs, averages)
+    ]
+    print(tabulate(table_data, headers=["Professor", "Module", "Average"], tablefmt="grid", disable_numparse=True))
 
 
 # ------------------------------------------------------------------------
@@ -241,7 +456,7 @@ def average_rate(command):
 # ------------------------------------------------------------------------
 
 def main():
-    print("Available commands: register, login <url>, logout, list, view, rate <prof_id> <module_code> <year> <semester> <rating>, average <prof_id> <module_code>, exit")
+    print("Available commands: register, login <url>, logout, list, view, rate <prof_id> <module_code> <year> <semester> <rating>, average <prof_id> <module_code> [...] | all, exit")
     while True:
         command = input("Enter command: ").strip().lower()
         if command == 'register':